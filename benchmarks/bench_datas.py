@@ -0,0 +1,98 @@
+"""
+Benchmark da conversão da coluna Data.
+
+Compara o parse valor a valor (formatos tentados em sequência para cada
+linha, como o antigo converter_data_robusta) com ingestao.converter_datas,
+que converte cada valor distinto uma vez e cada formato sobre o array
+inteiro. As datas saem de uma mistura de formatos (inclusive ISO com "T",
+como vêm do Power BI, e com fuso), com uma fração que só o parse dayfirst
+entende.
+
+Também confere o resultado: qualquer data convertida diferente da gerada
+faz o script sair com código 1.
+
+Uso:
+    python benchmarks/bench_datas.py --linhas 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingestao import FORMATOS_DATA, converter_datas  # noqa: E402
+
+# A linha a linha é medida numa amostra e extrapolada (é linear no número de linhas)
+AMOSTRA_LINHA_A_LINHA = 20_000
+
+
+FORMATOS_GERADOS = ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%Y %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M:%S.000Z")
+# Horário noturno com fuso: tem de sair no horário local (23:30 do mesmo dia),
+# não convertido para UTC (02:30 do dia seguinte).
+FORMATO_FUSO = "%Y-%m-%dT23:30:00-03:00"
+HORA_FUSO = np.timedelta64(23 * 60 + 30, "m")
+
+
+def gerar_datas(linhas, dias=365, fracao_lenta=0.01, seed=0):
+    """(valores em texto, datas esperadas) com dias em que o dia vem antes e depois do mês."""
+    rng = np.random.default_rng(seed)
+    dias_base = pd.date_range("2025-01-01", periods=dias)
+    formatos = [dias_base.strftime(f) for f in FORMATOS_GERADOS + (FORMATO_FUSO,)]
+    opcoes = np.concatenate([f.to_numpy() for f in formatos])
+    escolhas = rng.integers(0, len(opcoes), linhas)
+    valores = opcoes[escolhas].astype(object)
+    horas = np.concatenate([np.zeros(dias * len(FORMATOS_GERADOS), "timedelta64[ns]"),
+                            np.full(dias, HORA_FUSO, "timedelta64[ns]")])
+    esperadas = dias_base.to_numpy()[escolhas % dias] + horas[escolhas]
+    lentas = rng.random(linhas) < fracao_lenta
+    dias_lentos = rng.integers(0, dias, lentas.sum())
+    valores[lentas] = dias_base.strftime("%b %d %Y").to_numpy()[dias_lentos]
+    esperadas[lentas] = dias_base.to_numpy()[dias_lentos]
+    return pd.Series(valores), pd.Series(esperadas)
+
+
+def converter_linha_a_linha(x):
+    if pd.isna(x) or x in ["", None]:
+        return pd.NaT
+    x = str(x).strip().replace("-", "/")
+    if ":" not in x:
+        x = x + " 00:00:00"
+    for fmt in FORMATOS_DATA:
+        try:
+            return pd.to_datetime(x, format=fmt)
+        except ValueError:
+            continue
+    return pd.to_datetime(x, dayfirst=True, errors="coerce")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", UserWarning)
+
+    print(f"{'linhas':>10} {'linha(s)':>10} {'vetor(s)':>10} {'lentas':>8} {'ganho':>8} {'erradas':>8}")
+    erradas_total = 0
+    for linhas in args.linhas:
+        datas, esperadas = gerar_datas(linhas)
+        amostra = datas.iloc[:AMOSTRA_LINHA_A_LINHA]
+        t0 = time.perf_counter()
+        amostra.map(converter_linha_a_linha)
+        t_linha = (time.perf_counter() - t0) * linhas / len(amostra)
+        t0 = time.perf_counter()
+        convertidas, lentas = converter_datas(datas)
+        t_vetor = time.perf_counter() - t0
+        erradas = int(convertidas.ne(esperadas).sum())
+        erradas_total += erradas
+        print(f"{linhas:>10} {t_linha:>10.3f} {t_vetor:>10.3f} {lentas:>8} {t_linha / t_vetor:>7.0f}x {erradas:>8}")
+    if erradas_total:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
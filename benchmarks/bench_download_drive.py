@@ -0,0 +1,167 @@
+"""
+Benchmark do download concorrente dos JSONs diários.
+
+Simula um serviço do Drive local (sem rede) com latência fixa por requisição
+e mede o tempo de parede para carregar um mês inteiro com diferentes números
+de threads.
+
+Uso:
+    python benchmarks/bench_download_drive.py --dias 30 --latencia 0.15
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import httplib2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_disco import CacheArquivos  # noqa: E402
+from fontes import FonteDrive  # noqa: E402
+from ingestao import baixar_arquivos_concorrente, selecionar_arquivos_periodo  # noqa: E402
+
+
+# ===============================
+# DRIVE FALSO
+# ===============================
+
+class _FakeHttp:
+    """Imita o httplib2.Http usado pelo MediaIoBaseDownload."""
+
+    def __init__(self, conteudo, latencia):
+        self._conteudo = conteudo
+        self._latencia = latencia
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        time.sleep(self._latencia)
+        resp = httplib2.Response({"status": 200, "content-length": str(len(self._conteudo))})
+        return resp, self._conteudo
+
+
+class _FakeMediaRequest:
+    def __init__(self, file_id, conteudo, latencia):
+        self.uri = f"fake://drive/{file_id}?alt=media"
+        self.headers = {}
+        self.http = _FakeHttp(conteudo, latencia)
+
+
+class _FakeListRequest:
+    def __init__(self, files, latencia, page_size, page_token):
+        self._files = files
+        self._latencia = latencia
+        self._page_size = page_size
+        self._inicio = int(page_token or 0)
+
+    def execute(self, http=None):
+        time.sleep(self._latencia)
+        fim = self._inicio + self._page_size
+        resposta = {"files": list(self._files[self._inicio:fim])}
+        if fim < len(self._files):
+            resposta["nextPageToken"] = str(fim)
+        return resposta
+
+
+class _FakeFiles:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def list(self, pageSize=100, pageToken=None, **kwargs):
+        return _FakeListRequest(self._drive.listagem, self._drive.latencia, pageSize, pageToken)
+
+    def get_media(self, fileId):
+        return _FakeMediaRequest(fileId, self._drive.conteudos[fileId], self._drive.latencia)
+
+
+class FakeDriveService:
+    """Serviço do Drive em memória: {file_id: bytes} + listagem."""
+
+    def __init__(self, arquivos, latencia):
+        self.latencia = latencia
+        self.conteudos = {}
+        self.listagem = []
+        for i, (nome, conteudo) in enumerate(arquivos.items()):
+            file_id = f"id{i:05d}"
+            self.conteudos[file_id] = conteudo
+            self.listagem.append({
+                "id": file_id, "name": nome, "mimeType": "application/json",
+                "modifiedTime": "2026-01-01T00:00:00.000Z",
+            })
+
+    def files(self):
+        return _FakeFiles(self)
+
+
+class ClienteFalso:
+    """Interface do cliente_drive.ClienteDrive sobre um FakeDriveService (sem credenciais nem pool)."""
+
+    def __init__(self, service):
+        self._service = service
+
+    def servico(self):
+        return self._service
+
+    @contextmanager
+    def conexao(self):
+        # Sem conexão própria: as requisições falsas já trazem o seu http
+        yield None
+
+
+def gerar_mes(inicio, dias, linhas_por_dia, chaves=None):
+    """
+    JSONs diários no formato exportado (tables[].rows com colunas entre
+    colchetes). `chaves` troca as Chave2 sintéticas por chaves reais da
+    planilha de núcleos.
+    """
+    if chaves is None:
+        chaves = [f"EMP{i % 40:02d}SETOR{i % 7}" for i in range(280)]
+    arquivos = {}
+    for d in range(dias):
+        dia = inicio + timedelta(days=d)
+        rows = [
+            {
+                "Tabela[Chave2]": chaves[i % len(chaves)],
+                "Tabela[Penalidades]": ("VPML", "Pontual%", "Reclamacoes", "NotaConducao")[i % 4],
+                "[Contagem]": (i * 37 % 100) / 100,
+            }
+            for i in range(linhas_por_dia)
+        ]
+        doc = {"results": [{"tables": [{"rows": rows}]}]}
+        arquivos[f"daily_{dia.isoformat()}.json"] = json.dumps(doc).encode("utf-8")
+    return arquivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--linhas", type=int, default=2000, help="linhas por arquivo diário")
+    parser.add_argument("--latencia", type=float, default=0.15, help="segundos por requisição")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--cache", action="store_true",
+                        help="usa um cache em disco temporário (a partir da 2ª rodada tudo vem do disco)")
+    args = parser.parse_args()
+
+    cache = CacheArquivos(tempfile.mkdtemp(prefix="bench_cache_")) if args.cache else None
+
+    inicio = date(2026, 3, 1)
+    fim = inicio + timedelta(days=args.dias - 1)
+    service = FakeDriveService(gerar_mes(inicio, args.dias, args.linhas), args.latencia)
+
+    print(f"{'workers':>8} {'segundos':>10} {'linhas':>10} {'falhas':>7}")
+    for workers in args.workers:
+        t0 = time.perf_counter()
+        fonte = FonteDrive("pasta", ClienteFalso(service))
+        files = fonte.listar_mes(inicio.year, inicio.month)
+        arquivos = selecionar_arquivos_periodo(files, inicio, fim)
+        dfs, falhas = baixar_arquivos_concorrente(fonte, arquivos, max_workers=workers, cache=cache)
+        linhas = sum(len(df) for df in dfs)
+        elapsed = time.perf_counter() - t0
+        print(f"{workers:>8} {elapsed:>10.3f} {linhas:>10} {len(falhas):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark de escala do pipeline completo com dados sintéticos.
+
+Para cada escala (núcleos x setores x indicadores x dias) gera as
+exportações diárias e a planilha de núcleos (dados_sinteticos.py), roda o
+motor sobre uma FonteMemoria com cache em disco vazio e mede:
+  - ingestao: download + parse + totais diários de todos os arquivos;
+  - consolidacao: códigos de núcleo, esquema e recorte do período;
+  - cubo, metas e resumo;
+  - pivot e tabelas: soma dos pivots e das tabelas completas (Meta, GERAL,
+    status) de todos os indicadores;
+  - payload: bytes das linhas + GERAL que vão ao AgGrid, total e do maior
+    indicador (os gridOptions quase não mudam com a escala).
+
+Os resultados saem em JSON (--saida) e podem ser comparados com uma rodada
+anterior (--comparar): etapas mais lentas que a base além da tolerância
+fazem o script sair com código 1.
+
+Uso:
+    python benchmarks/bench_escala.py --escalas pequena media grande --saida resultados.json
+    python benchmarks/bench_escala.py --comparar resultados.json --tolerancia 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dados_sinteticos import gerar_exportacoes, gerar_nucleos  # noqa: E402
+from fontes import FonteMemoria  # noqa: E402
+from medicao import Medicao  # noqa: E402
+from motor import calcular_tabelas, carregar_periodo  # noqa: E402
+
+ESCALAS = {
+    "pequena": {"nucleos": 6, "setores": 3, "indicadores": 10, "dias": 7},
+    "media": {"nucleos": 30, "setores": 5, "indicadores": 20, "dias": 30},
+    "grande": {"nucleos": 60, "setores": 10, "indicadores": 20, "dias": 90},
+}
+ETAPAS_TEMPO = ["ingestao", "consolidacao", "cubo", "metas", "resumo", "pivot", "tabelas", "total"]
+# Etapas mais rápidas que isso não entram na comparação (ruído de medição)
+PISO_COMPARACAO_S = 0.02
+
+
+def rodar_escala(params, workers):
+    """Uma rodada a frio (cache em disco novo) de uma escala; devolve as métricas."""
+    inicio = date(2026, 1, 1)
+    fim = inicio + timedelta(days=params["dias"] - 1)
+    df_nucleos = gerar_nucleos(params["nucleos"], params["setores"])
+    arquivos = gerar_exportacoes(df_nucleos, inicio, params["dias"], params["indicadores"])
+    fonte = FonteMemoria(arquivos, df_nucleos, identificador="sintetica")
+    os.environ["DAILY_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_escala_")
+
+    medicao = Medicao()
+    nucleos = fonte.carregar_nucleos()
+    t0 = time.perf_counter()
+    df, falhas, _ = carregar_periodo(fonte, nucleos, inicio, fim, hoje=fim, max_workers=workers, medicao=medicao)
+    t_carga = time.perf_counter() - t0
+    tabelas, _ = calcular_tabelas(df, nucleos, medicao=medicao)
+    t_total = time.perf_counter() - t0
+
+    por_etapa = pd.DataFrame(medicao.registros()).groupby("etapa")["segundos"].sum()
+    consolidacao = por_etapa.get("consolidacao", 0.0) + por_etapa.get("recorte_periodo", 0.0)
+    payload = [
+        len(tabela.to_json(orient="records")) + len(geral.to_json(orient="records"))
+        for tabela, geral in tabelas.values()
+    ]
+    linhas_brutas = sum(
+        r.get("linhas", 0) for r in medicao.registros() if r["etapa"] == "totais_diarios"
+    )
+    return {
+        **params,
+        "arquivos": len(arquivos),
+        "mb_json": round(sum(len(c) for c in arquivos.values()) / 2**20, 2),
+        "linhas_brutas": linhas_brutas,
+        "totais_diarios": len(df),
+        "falhas": len(falhas),
+        "tabelas_geradas": len(tabelas),
+        "segundos": {
+            "ingestao": t_carga - consolidacao,
+            "consolidacao": consolidacao,
+            "cubo": por_etapa.get("cubo", 0.0),
+            "metas": por_etapa.get("metas", 0.0),
+            "resumo": por_etapa.get("resumo", 0.0),
+            "pivot": por_etapa.get("pivot", 0.0),
+            "tabelas": por_etapa.get("indicador", 0.0),
+            "total": t_total,
+        },
+        "payload_bytes": sum(payload),
+        "payload_max_bytes": max(payload, default=0),
+    }
+
+
+def melhor_de(params, workers, repeticoes):
+    """Menor tempo de cada etapa entre as repetições (tamanhos são iguais em todas)."""
+    rodadas = [rodar_escala(params, workers) for _ in range(repeticoes)]
+    resultado = rodadas[0]
+    resultado["segundos"] = {
+        etapa: round(min(r["segundos"][etapa] for r in rodadas), 4) for etapa in ETAPAS_TEMPO
+    }
+    return resultado
+
+
+def comparar(base, atual, tolerancia):
+    """Linhas de comparação e se houve regressão (tempo acima da base além da tolerância)."""
+    base_por_escala = {r["escala"]: r for r in base["resultados"]}
+    linhas, regressao = [], False
+    for r in atual["resultados"]:
+        b = base_por_escala.get(r["escala"])
+        if b is None:
+            continue
+        for etapa in ETAPAS_TEMPO:
+            antes, depois = b["segundos"][etapa], r["segundos"][etapa]
+            if max(antes, depois) < PISO_COMPARACAO_S:
+                continue
+            razao = depois / antes if antes else float("inf")
+            pior = razao > 1 + tolerancia
+            regressao |= pior
+            linhas.append(f"{r['escala']:>8} {etapa:>12} {antes:>9.3f} {depois:>9.3f} {razao:>6.2f}x"
+                          + ("  <-- regressão" if pior else ""))
+        if r["payload_bytes"] != b["payload_bytes"]:
+            linhas.append(f"{r['escala']:>8} {'payload':>12} {b['payload_bytes']:>9} {r['payload_bytes']:>9}")
+    return linhas, regressao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escalas", nargs="+", choices=list(ESCALAS), default=["pequena", "media"])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="threads de leitura (1 mede o custo de CPU sem disputa pelo GIL)")
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    parser.add_argument("--comparar", help="JSON de uma rodada anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="fração de piora aceita (padrão: 0.25)")
+    args = parser.parse_args()
+
+    resultados = {
+        "gerado_em": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "maquina": platform.machine(),
+        "workers": args.workers,
+        "repeticoes": args.repeticoes,
+        "resultados": [],
+    }
+    print(f"{'escala':>8} {'linhas':>10} " + " ".join(f"{e:>12}" for e in ETAPAS_TEMPO) + f" {'payload KB':>11}")
+    for nome in args.escalas:
+        r = {"escala": nome, **melhor_de(ESCALAS[nome], args.workers, args.repeticoes)}
+        resultados["resultados"].append(r)
+        print(f"{nome:>8} {r['linhas_brutas']:>10} " + " ".join(f"{r['segundos'][e]:>12.3f}" for e in ETAPAS_TEMPO)
+              + f" {r['payload_bytes'] / 1024:>11,.0f}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        linhas, regressao = comparar(base, resultados, args.tolerancia)
+        print(f"\n{'escala':>8} {'etapa':>12} {'base(s)':>9} {'atual(s)':>9} {'razão':>7}")
+        print("\n".join(linhas))
+        if regressao:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
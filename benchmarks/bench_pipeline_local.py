@@ -0,0 +1,88 @@
+"""
+Benchmark da consolidação completa a partir de uma pasta local, sem rede.
+
+Roda listagem, leitura + parse dos JSONs (com a redução a totais diários),
+consolidação (códigos de núcleo e esquema) e o cubo sobre uma FonteDiretorio. Com --diretorio usa uma pasta
+real de JSONs diários; sem ele, gera um mês sintético numa pasta temporária
+com chaves da planilha de núcleos local.
+
+Uso:
+    python benchmarks/bench_pipeline_local.py --dias 30 --linhas 20000
+    python benchmarks/bench_pipeline_local.py --diretorio /caminho/dos/jsons --mes 2026-03
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_download_drive import gerar_mes  # noqa: E402
+from calculos import agregar_diario, calcular_cubo  # noqa: E402
+from esquema import aplicar_esquema  # noqa: E402
+from fontes import FonteDiretorio  # noqa: E402
+from ingestao import ConsolidadoIncremental, baixar_arquivos_por_id, selecionar_arquivos_periodo  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--diretorio", help="pasta com os JSONs diários (padrão: mês sintético)")
+    parser.add_argument("--mes", default="2026-03", help="AAAA-MM a carregar")
+    parser.add_argument("--dias", type=int, default=30, help="dias do mês sintético")
+    parser.add_argument("--linhas", type=int, default=20000, help="linhas por arquivo sintético")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    ano, mes = (int(p) for p in args.mes.split("-"))
+    inicio = date(ano, mes, 1)
+    fim = (inicio.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+    diretorio = args.diretorio
+    if diretorio is None:
+        diretorio = tempfile.mkdtemp(prefix="bench_local_")
+        chaves = FonteDiretorio(diretorio).carregar_nucleos().dimensao["Chave"].tolist()
+        for nome, conteudo in gerar_mes(inicio, min(args.dias, fim.day), args.linhas, chaves).items():
+            with open(os.path.join(diretorio, nome), "wb") as f:
+                f.write(conteudo)
+    fonte = FonteDiretorio(diretorio)
+
+    tempos = {}
+    t0 = time.perf_counter()
+    nucleos = fonte.carregar_nucleos()
+    arquivos = selecionar_arquivos_periodo(fonte.listar_mes(ano, mes), inicio, fim)
+    tempos["listagem + núcleos"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    estado = ConsolidadoIncremental()
+    linhas_brutas = 0
+
+    def carregar(pendentes):
+        nonlocal linhas_brutas
+        frames, falhas = baixar_arquivos_por_id(fonte, pendentes, max_workers=args.workers)
+        linhas_brutas += sum(len(df) for df in frames.values())
+        return {file_id: agregar_diario(df) for file_id, df in frames.items()}, falhas
+
+    resumo = estado.atualizar(arquivos, carregar)
+    df_raw = estado.frame()
+    tempos["leitura + parse"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    df = aplicar_esquema(nucleos.codificar_fatos(df_raw))
+    tempos["consolidação"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    cubo = calcular_cubo(df, nucleos)
+    tempos["cubo"] = time.perf_counter() - t0
+
+    print(f"arquivos: {len(arquivos)}  linhas: {linhas_brutas}  totais: {len(df)}  "
+          f"sobrepostas: {estado.linhas_sobrepostas}  falhas: {len(resumo['falhas'])}  cubo: {len(cubo)}")
+    for etapa, segundos in tempos.items():
+        print(f"{etapa:>20} {segundos:>8.3f}s")
+    total = sum(tempos.values())
+    print(f"{'total':>20} {total:>8.3f}s  ({linhas_brutas / total:,.0f} linhas/s)")
+
+
+if __name__ == "__main__":
+    main()
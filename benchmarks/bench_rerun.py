@@ -0,0 +1,118 @@
+"""
+Benchmark do trabalho por rerun da página (montagem dos pivots e das metas).
+
+Compara, para consolidados de tamanhos diferentes:
+  - mascara: um filtro `df["Penalidades"] == pen` por indicador e por meta,
+    seguido de pivot_table (como a página fazia);
+  - particao: totais diários + cubo + particionar_por_penalidade (uma
+    passada), pivot direto da fatia de cada indicador e metas dinâmicas de
+    todos os indicadores numa passada só. Os totais, o cubo e as metas são
+    calculados uma vez por período e ficam em cache, então aparecem numa
+    coluna separada.
+
+Uso:
+    python benchmarks/bench_rerun.py --linhas 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculos import (  # noqa: E402
+    agregar_diario, calcular_cubo, calcular_metas_dinamicas, filtrar_cubo, meta_geral, particionar_por_penalidade,
+    pivot_indicador,
+)
+from esquema import aplicar_esquema  # noqa: E402
+from nucleos import TabelaNucleos  # noqa: E402
+
+INDICADORES = [f"IND{i:02d}" for i in range(40)]
+METAS_DINAMICAS = {
+    "IND00": "Meta VPML", "IND01": "MetaReclamacoes", "IND02": "MetaAcidentes",
+    "IND03": "MetaMultasReg", "IND04": "Meta_MultasTransito",
+}
+METAS = list(METAS_DINAMICAS.values())
+
+
+def gerar_linhas(linhas, dias=30, setores=300, seed=0):
+    """Linhas brutas sintéticas (como saem do parse) e a dimensão de núcleos correspondente."""
+    rng = np.random.default_rng(seed)
+    penalidades = np.array(INDICADORES + METAS)
+    nucleos = TabelaNucleos(pd.DataFrame({
+        "Empresa": [f"EMP{i % 7}" for i in range(setores)],
+        "Setor": [f"S{i:03d}" for i in range(setores)],
+        "Nucleo": [f"NUC{i % 30:02d}" for i in range(setores)],
+        "Regional": [f"REG{i % 5}" for i in range(setores)],
+    }), "sintetica")
+    setor = rng.integers(0, setores, linhas)
+    df = pd.DataFrame({
+        "Penalidades": penalidades[rng.integers(0, len(penalidades), linhas)],
+        "Chave2": nucleos.dimensao["Chave"].to_numpy()[setor],
+        "Data": pd.Timestamp("2026-03-01") + pd.to_timedelta(rng.integers(0, dias, linhas), unit="D"),
+        "Contagem": np.where(rng.random(linhas) < 0.1, np.nan, rng.random(linhas)),
+    })
+    return df, nucleos
+
+
+def rerun_mascara(df):
+    for pen in INDICADORES:
+        df_pen = df[df["Penalidades"] == pen]
+        df_pen.pivot_table(index=["Regional", "Nucleo", "Setor"], columns="Data",
+                           values="Contagem", aggfunc="sum", observed=True)
+    for meta in METAS:
+        df_meta = df[df["Penalidades"] == meta]
+        df_meta.groupby(["Nucleo", "Setor", "Data"], observed=True)["Contagem"].sum()
+
+
+def preparar_particao(df_bruto, nucleos):
+    df = aplicar_esquema(nucleos.codificar_fatos(agregar_diario(df_bruto)))
+    dims = nucleos.dimensao
+    _, parciais = calcular_metas_dinamicas(
+        df, METAS_DINAMICAS, {"IND00"}, nucleos, dims["Nucleo"].unique(), dims["Setor"].unique()
+    )
+    return calcular_cubo(df, nucleos), parciais
+
+
+def rerun_particao(cubo, parciais_metas):
+    fatias = particionar_por_penalidade(filtrar_cubo(cubo, []))
+    for pen in INDICADORES:
+        pivot = pivot_indicador(fatias.get(pen), eh_media=False, eh_percentual=False)
+        if pen in METAS_DINAMICAS:
+            meta_geral(parciais_metas, pen, pivot.index.get_level_values("Nucleo").unique(), pen == "IND00")
+
+
+def cronometrar(func, *args, repeticoes=3):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        func(*args)
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'mascara(s)':>11} {'particao(s)':>12} {'preparo(s)':>11} {'ganho':>7}")
+    for linhas in args.linhas:
+        df_bruto, nucleos = gerar_linhas(linhas)
+        # A versão com máscara trabalhava sobre linhas brutas com Regional/Núcleo/Setor já anexados
+        df_mascara = aplicar_esquema(nucleos.anexar(nucleos.codificar_fatos(df_bruto)))
+        t_mascara = cronometrar(rerun_mascara, df_mascara, repeticoes=args.repeticoes)
+        t0 = time.perf_counter()
+        cubo, parciais_metas = preparar_particao(df_bruto, nucleos)
+        t_preparo = time.perf_counter() - t0
+        t_particao = cronometrar(rerun_particao, cubo, parciais_metas, repeticoes=args.repeticoes)
+        print(f"{linhas:>10} {t_mascara:>11.3f} {t_particao:>12.3f} {t_preparo:>11.3f} "
+              f"{t_mascara / t_particao:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
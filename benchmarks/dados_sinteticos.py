@@ -0,0 +1,82 @@
+"""
+Gerador de dados sintéticos no formato real: exportações diárias em JSON
+(results[].result.data.tables[].rows, colunas entre colchetes) e a planilha
+de núcleos correspondente, em qualquer escala.
+
+Os indicadores são os de indicadores.py (com as penalidades de meta
+dinâmica), então percentuais, médias, somas e metas seguem as mesmas regras
+da página.
+"""
+import json
+import os
+import sys
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicadores import (  # noqa: E402
+    INTEIROS_LIST, METAS_DINAMICAS, PERCENTUAIS_LIST, ordem_indicadores,
+)
+
+
+def gerar_nucleos(nucleos, setores_por_nucleo, regionais=None, empresas_por_nucleo=2):
+    """
+    Planilha de núcleos (Empresa, Setor, Nucleo, Regional) com `nucleos`
+    núcleos de `setores_por_nucleo` setores cada, distribuídos entre as
+    empresas do núcleo.
+    """
+    regionais = regionais or max(1, nucleos // 10)
+    linhas = []
+    for n in range(nucleos):
+        for s in range(setores_por_nucleo):
+            linhas.append({
+                "Empresa": f"E{n:03d}{s % empresas_por_nucleo}",
+                "Setor": f"S{s:02d}",
+                "Nucleo": f"NUC{n:03d}",
+                "Regional": f"REG{n % regionais:02d}",
+            })
+    return pd.DataFrame(linhas)
+
+
+def escolher_indicadores(quantidade):
+    """Os primeiros `quantidade` indicadores exibíveis e as penalidades de meta dinâmica deles."""
+    indicadores = ordem_indicadores()[:quantidade]
+    metas = [METAS_DINAMICAS[p] for p in indicadores if p in METAS_DINAMICAS]
+    return indicadores, metas
+
+
+def _valores(penalidade, rng, n):
+    if penalidade in PERCENTUAIS_LIST:
+        return np.round(rng.beta(8, 2, n), 4)
+    if penalidade in INTEIROS_LIST or penalidade in METAS_DINAMICAS.values():
+        return rng.poisson(2, n).astype(float)
+    return np.round(rng.gamma(2.0, 10.0, n), 2)
+
+
+def gerar_exportacoes(df_nucleos, inicio, dias, indicadores=20, fracao_vazia=0.05, fracao_ausente=0.1, seed=0):
+    """
+    {nome_arquivo: bytes} com um JSON por dia a partir de `inicio`. Cada dia
+    traz uma linha por (Chave2, penalidade), menos `fracao_ausente` delas;
+    `fracao_vazia` das linhas vem com Contagem nula.
+    """
+    rng = np.random.default_rng(seed)
+    penalidades = sum(escolher_indicadores(indicadores), [])
+    chaves = (df_nucleos["Empresa"].astype(str) + df_nucleos["Setor"].astype(str)).to_numpy()
+    arquivos = {}
+    for d in range(dias):
+        dia = inicio + timedelta(days=d)
+        rows = []
+        for pen in penalidades:
+            presentes = chaves[rng.random(len(chaves)) >= fracao_ausente]
+            valores = _valores(pen, rng, len(presentes))
+            vazios = rng.random(len(presentes)) < fracao_vazia
+            rows.extend(
+                {"Tabela[Chave2]": chave, "Tabela[Penalidades]": pen, "[Contagem]": None if vazio else valor}
+                for chave, valor, vazio in zip(presentes.tolist(), valores.tolist(), vazios.tolist())
+            )
+        doc = {"results": [{"result": {"data": {"tables": [{"rows": rows}]}}}]}
+        arquivos[f"daily_{dia.isoformat()}.json"] = json.dumps(doc).encode("utf-8")
+    return arquivos
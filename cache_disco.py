@@ -0,0 +1,143 @@
+import glob
+import os
+import re
+import tempfile
+
+import pandas as pd
+
+from calculos import COLUNAS_TOTAIS
+from esquema import aplicar_esquema
+
+# ===============================
+# CACHE LOCAL EM DISCO
+# ===============================
+# Tabelas já parseadas de cada arquivo diário, gravadas em Parquet e
+# identificadas pelo id do arquivo no Drive + modifiedTime. Um arquivo que
+# não mudou nunca é baixado de novo, mesmo após reiniciar o servidor.
+
+DIRETORIO_CACHE_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".daily_cache")
+
+
+def diretorio_cache():
+    return os.environ.get("DAILY_CACHE_DIR", DIRETORIO_CACHE_PADRAO)
+
+
+def _slug(valor):
+    return re.sub(r'[^0-9A-Za-z_-]', '', str(valor))
+
+
+def preparar_para_parquet(df):
+    """Colunas object com tipos misturados (ex.: número e texto) viram texto."""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            tipo = pd.api.types.infer_dtype(df[col], skipna=True)
+            if tipo not in ("string", "empty"):
+                df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+
+def gravar_parquet_atomico(df, caminho):
+    """Grava em arquivo temporário e renomeia, para leitores nunca verem arquivo pela metade."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, caminho)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _sufixo_projecao(projecao):
+    """Trecho do nome do arquivo para a chave de uma ingestao.Projecao ("" na completa)."""
+    return f"__{_slug(projecao)}" if projecao else ""
+
+
+class CacheArquivos:
+    """
+    Cache de DataFrames por (file_id, modifiedTime, projeção) em
+    `<diretorio>/arquivos`; `projecao` é a `chave` da ingestao.Projecao usada
+    no parse.
+    """
+
+    def __init__(self, diretorio=None):
+        self.diretorio = os.path.join(diretorio or diretorio_cache(), "arquivos")
+
+    def _caminho(self, file_id, modificado, projecao=""):
+        return os.path.join(
+            self.diretorio, f"{_slug(file_id)}__{_slug(modificado)}{_sufixo_projecao(projecao)}.parquet"
+        )
+
+    def ler(self, file_id, modificado, projecao=""):
+        """DataFrame em cache ou None se não houver versão para esse modifiedTime e projeção."""
+        if not modificado:
+            return None
+        caminho = self._caminho(file_id, modificado, projecao)
+        if not os.path.exists(caminho):
+            return None
+        try:
+            return pd.read_parquet(caminho)
+        except Exception:
+            # Arquivo corrompido/incompleto: trata como ausente e baixa de novo
+            return None
+
+    def gravar(self, file_id, modificado, df, projecao=""):
+        if not modificado:
+            return
+        caminho = self._caminho(file_id, modificado, projecao)
+        # Remove versões antigas do mesmo arquivo (e as de outra projeção)
+        for antigo in glob.glob(os.path.join(self.diretorio, f"{_slug(file_id)}__*.parquet")):
+            if antigo != caminho:
+                try:
+                    os.remove(antigo)
+                except OSError:
+                    pass
+        gravar_parquet_atomico(preparar_para_parquet(df), caminho)
+
+
+# ===============================
+# TOTAIS DIÁRIOS POR MÊS
+# ===============================
+# Os totais diários (calculos.agregar_diario) de cada mês fechado ficam numa
+# partição Parquet própria. Qualquer período (trimestre, 12 meses, janela
+# móvel) lê só as partições dos meses que toca, em vez de baixar e
+# reprocessar os JSONs de cada dia.
+
+def limites_mes(ano, mes):
+    """(primeiro dia, último dia) do mês."""
+    inicio = pd.Timestamp(year=ano, month=mes, day=1)
+    return inicio.date(), (inicio + pd.offsets.MonthEnd(0)).date()
+
+
+class TotaisDiarios:
+    """
+    Consolidado de cada mês fechado (totais diários no ESQUEMA_CONSOLIDADO)
+    em `<diretorio>/totais_diarios/<fonte>[__<projeção>]_<AAAA-MM>.parquet`:
+    uma partição feita com uma projeção não serve a outra.
+    """
+
+    def __init__(self, diretorio=None):
+        self.diretorio = os.path.join(diretorio or diretorio_cache(), "totais_diarios")
+
+    def _caminho(self, fonte, ano, mes, projecao=""):
+        return os.path.join(
+            self.diretorio, f"{_slug(fonte)}{_sufixo_projecao(projecao)}_{ano:04d}-{mes:02d}.parquet"
+        )
+
+    def ler(self, fonte, ano, mes, projecao=""):
+        """Totais do mês ou None se a partição não existir (ou for de um formato antigo)."""
+        caminho = self._caminho(fonte, ano, mes, projecao)
+        if not os.path.exists(caminho):
+            return None
+        try:
+            df = pd.read_parquet(caminho)
+        except Exception:
+            return None
+        return df if set(COLUNAS_TOTAIS).issubset(df.columns) else None
+
+    def gravar(self, fonte, ano, mes, df, projecao=""):
+        gravar_parquet_atomico(
+            aplicar_esquema(preparar_para_parquet(df)), self._caminho(fonte, ano, mes, projecao)
+        )
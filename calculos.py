@@ -0,0 +1,300 @@
+import numpy as np
+import pandas as pd
+
+# ===============================
+# TOTAIS DIÁRIOS
+# ===============================
+# Cada arquivo diário é reduzido, logo depois do parse, a Soma/Validos/Linhas
+# de Contagem por (Penalidades, Chave2, Data). Esses totais são somáveis: o
+# consolidado de qualquer período é a concatenação deles, e o cubo, as metas
+# e o GERAL saem daí sem voltar às linhas brutas.
+
+CHAVE_DIARIA = ["Penalidades", "Chave2", "Data"]
+COLUNAS_TOTAIS = ["Soma", "Validos", "Linhas"]
+
+
+def agregar_diario(df):
+    """
+    Totais de Contagem por (Penalidades, Chave2, Data) de um frame bruto.
+
+    Soma ignora vazios, Validos conta as linhas com Contagem e Linhas conta
+    todas (a média em que vazio vale 0 é Soma / Linhas). Texto inválido em
+    Contagem vira vazio; linhas sem Penalidades ou sem Data válida ficam de
+    fora, como ficariam no cubo.
+    """
+    if df.empty or "Penalidades" not in df.columns:
+        return pd.DataFrame({
+            "Penalidades": pd.Series(dtype=object),
+            "Chave2": pd.Series(dtype=object),
+            "Data": pd.Series(dtype="datetime64[ns]"),
+            "Soma": pd.Series(dtype="float64"),
+            "Validos": pd.Series(dtype="int32"),
+            "Linhas": pd.Series(dtype="int32"),
+        })
+    vazio = pd.Series(np.nan, index=df.index)
+    contagem = pd.to_numeric(df["Contagem"], errors="coerce") if "Contagem" in df.columns else vazio
+    chave2 = df["Chave2"] if "Chave2" in df.columns else vazio
+    data = pd.to_datetime(df["Data"], errors="coerce").dt.normalize() if "Data" in df.columns else vazio
+
+    chaves = [df["Penalidades"].rename("Penalidades"), chave2.rename("Chave2"), data.rename("Data")]
+    grupos = contagem.astype("float64").groupby(chaves, dropna=False, observed=True, sort=False)
+    totais = pd.DataFrame({
+        "Soma": grupos.sum(),
+        "Validos": grupos.count().astype("int32"),
+        "Linhas": grupos.size().astype("int32"),
+    }).reset_index()
+    return totais.dropna(subset=["Penalidades", "Data"]).reset_index(drop=True)
+
+
+# ===============================
+# CUBO DE AGREGAÇÃO POR INDICADOR
+# ===============================
+# Calculado uma vez por período carregado, independente dos filtros da
+# sidebar: os filtros só recortam o cubo e cada indicador vira um pivot
+# direto dele, sem varrer as linhas brutas de novo.
+
+NIVEIS_CUBO = ["Penalidades", "Regional", "Nucleo", "Setor", "Data"]
+
+
+def calcular_cubo(df, nucleos):
+    """
+    Agrega os totais diários por (Penalidades, Regional, Nucleo, Setor, Data).
+
+    Colunas: Soma (NaN ignorado), Media (NaN ignorado), Validos (linhas com
+    Contagem) e Linhas (total de linhas, para a média em que vazio conta 0).
+
+    A passada sobre o consolidado agrupa por CodNucleo; só o resultado, bem
+    menor, é resolvido na dimensão `nucleos` (TabelaNucleos) e reagregado,
+    já que chaves diferentes podem cair no mesmo setor. Setor vazio vira
+    "-" e linhas sem Regional/Núcleo ficam de fora, como no pivot_table.
+    """
+    base = df.groupby(["Penalidades", "CodNucleo", "Data"], observed=True, sort=False)[COLUNAS_TOTAIS].sum()
+    base = base.reset_index()
+
+    dims = nucleos.resolver(base["CodNucleo"].to_numpy())
+    dims["Setor"] = dims["Setor"].fillna("-")
+    base = pd.concat([base.drop(columns="CodNucleo"), dims], axis=1)
+
+    cubo = base.groupby(NIVEIS_CUBO, observed=True, sort=True)[COLUNAS_TOTAIS].sum()
+    cubo.insert(1, "Media", cubo["Soma"] / cubo["Validos"].where(cubo["Validos"] > 0))
+    return cubo
+
+
+def filtrar_cubo(cubo, filtros):
+    """
+    Recorta o cubo. `filtros` é uma lista de (nível, valores selecionados);
+    listas vazias não filtram, como os multiselects da sidebar.
+    """
+    mascara = np.ones(len(cubo), dtype=bool)
+    for nivel, valores in filtros:
+        if valores:
+            mascara &= cubo.index.get_level_values(nivel).isin(list(valores))
+    return cubo[mascara]
+
+
+def particionar_por_penalidade(df, penalidades=None):
+    """
+    {penalidade: linhas} em uma única passada (groupby().indices), em vez de
+    um filtro `df["Penalidades"] == pen` por indicador. Funciona tanto para
+    o consolidado (coluna Penalidades) quanto para o cubo (nível do índice).
+    Com `penalidades`, só essas partições são montadas.
+    """
+    if df.empty:
+        return {}
+    posicoes = df.groupby("Penalidades", observed=True, sort=False).indices
+    return {
+        pen: df.iloc[idx]
+        for pen, idx in posicoes.items()
+        if penalidades is None or pen in penalidades
+    }
+
+
+def pivot_indicador(fatia, eh_media, eh_percentual):
+    """
+    Pivot (Regional, Nucleo, Setor) x Data de um indicador a partir da sua
+    partição do cubo (saída de `particionar_por_penalidade`).
+
+    Soma para indicadores de soma; média ignorando vazios para percentuais;
+    demais médias tratam vazio como 0 (Soma / Linhas). Linhas e colunas sem
+    nenhum valor são descartadas, como no pivot_table.
+    """
+    if fatia is None or fatia.empty:
+        return pd.DataFrame()
+    if "Penalidades" in fatia.index.names:
+        fatia = fatia.droplevel("Penalidades")
+
+    if not eh_media:
+        valores = fatia["Soma"]
+    elif eh_percentual:
+        valores = fatia["Media"]
+    else:
+        valores = fatia["Soma"] / fatia["Linhas"]
+
+    pivot = valores.unstack("Data").sort_index(axis=1)
+    return pivot.dropna(how="all").dropna(how="all", axis=1)
+
+
+# ===============================
+# STATUS (FAROL) DOS INDICADORES
+# ===============================
+# Códigos calculados em lote (numpy.select) para Acum x Meta de qualquer
+# formato de array; a página mostra o ícone e o grid só lê o código.
+
+STATUS_SEM_META = 0
+STATUS_SEM_DADO = 1
+STATUS_VERDE = 2
+STATUS_AMARELO = 3
+STATUS_VERMELHO = 4
+
+ICONE_STATUS = np.array(["⚫", "⚪", "🟢", "🟡", "🔴"])
+
+
+def calcular_status(acum, meta, menor_melhor):
+    """
+    Código de status para cada posição de `acum` x `meta` (arrays float com
+    NaN para vazio, com broadcast; `menor_melhor` pode ser escalar ou array).
+
+    Sem meta -> SEM_META; acum e meta zerados -> VERDE; sem acum -> SEM_DADO;
+    melhor que a meta -> VERDE; igual -> AMARELO; pior -> VERMELHO.
+    """
+    acum = np.asarray(acum, dtype="float64")
+    meta = np.asarray(meta, dtype="float64")
+    menor_melhor = np.asarray(menor_melhor, dtype=bool)
+    with np.errstate(invalid="ignore"):
+        melhor = np.where(menor_melhor, acum < meta, acum > meta)
+        condicoes = [np.isnan(meta), (acum == 0) & (meta == 0), np.isnan(acum), melhor, acum == meta]
+    escolhas = [STATUS_SEM_META, STATUS_VERDE, STATUS_SEM_DADO, STATUS_VERDE, STATUS_AMARELO]
+    return np.select(condicoes, escolhas, default=STATUS_VERMELHO).astype(np.int8)
+
+
+def _para_float(df):
+    """Matriz float64 com NaN no lugar de None/pd.NA (colunas object ou nullable)."""
+    numerico = df.apply(pd.to_numeric, errors="coerce")
+    return numerico.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def colunas_status(df, colunas, menor_melhor):
+    """DataFrame `_st_<coluna>` com o status de cada coluna de valor contra a Meta da linha."""
+    valores = _para_float(df[colunas])
+    meta = _para_float(df[["Meta"]])
+    status = calcular_status(valores, meta, menor_melhor)
+    return pd.DataFrame(status, index=df.index, columns=[f"_st_{c}" for c in colunas])
+
+
+# ===============================
+# METAS DINÂMICAS
+# ===============================
+# As metas por setor vêm de penalidades próprias (ex.: "Meta VPML" para
+# VPML). Todas são calculadas juntas, uma vez por período: uma passada
+# agrupa os totais por (meta, CodNucleo, Data) e só esse resultado é
+# resolvido na dimensão de núcleos.
+
+def calcular_metas_dinamicas(df, metas_dinamicas, metas_media, nucleos, nucleos_visiveis, setores_visiveis):
+    """
+    Metas dinâmicas de todos os indicadores de `metas_dinamicas`
+    ({indicador: penalidade da meta}) a partir do consolidado do período.
+
+    Retorna (metas_setor, parciais_nucleo), ambos com Penalidades = indicador:
+      - metas_setor: Series Meta indexada por (Penalidades, Nucleo, Setor),
+        no último dia com meta do indicador, só para os núcleos/setores
+        visíveis;
+      - parciais_nucleo: Soma e Validos por (Nucleo, Data), para a meta
+        GERAL do recorte que estiver na tela (ver `meta_geral`).
+    A meta é média (Soma / Validos) para os indicadores em `metas_media` e
+    soma para os demais.
+    """
+    indicador_da_meta = {meta: pen for pen, meta in metas_dinamicas.items()}
+    linhas = df[df["Penalidades"].isin(list(indicador_da_meta))]
+    base = linhas.groupby(["Penalidades", "CodNucleo", "Data"], observed=True, sort=False)[["Soma", "Validos"]].sum()
+    base = base.reset_index()
+    base["Penalidades"] = base["Penalidades"].astype(str).map(indicador_da_meta)
+    base = pd.concat([base.drop(columns="CodNucleo"), nucleos.resolver(base["CodNucleo"].to_numpy())], axis=1)
+
+    parciais_nucleo = base.groupby(["Penalidades", "Nucleo", "Data"], sort=False)[["Soma", "Validos"]].sum()
+    parciais_nucleo = parciais_nucleo.reset_index()
+
+    visiveis = base[base["Nucleo"].isin(nucleos_visiveis) & base["Setor"].isin(setores_visiveis)]
+    setores = visiveis.groupby(["Penalidades", "Nucleo", "Setor", "Data"], sort=False)[["Soma", "Validos"]].sum()
+    setores = setores.reset_index()
+    setores = setores[setores["Data"] == setores.groupby("Penalidades")["Data"].transform("max")]
+    media = setores["Soma"] / setores["Validos"].where(setores["Validos"] > 0)
+    setores["Meta"] = media.where(setores["Penalidades"].isin(metas_media), setores["Soma"])
+    metas_setor = setores.set_index(["Penalidades", "Nucleo", "Setor"])["Meta"]
+    return metas_setor, parciais_nucleo
+
+
+def meta_geral(parciais_nucleo, pen, nucleos_do_indicador, eh_media):
+    """
+    Meta da linha GERAL de um indicador: parciais dos núcleos exibidos no
+    último dia com meta entre eles, somados (ou Soma / Validos, para média).
+    pd.NA se não houver meta para esses núcleos.
+    """
+    parciais = parciais_nucleo[
+        (parciais_nucleo["Penalidades"] == pen) & parciais_nucleo["Nucleo"].isin(nucleos_do_indicador)
+    ]
+    if parciais.empty:
+        return pd.NA
+    parciais = parciais[parciais["Data"] == parciais["Data"].max()]
+    soma = parciais["Soma"].sum()
+    if eh_media:
+        validos = parciais["Validos"].sum()
+        return soma / validos if validos > 0 else np.nan
+    return soma
+
+
+# ===============================
+# RESUMO INDICADOR x NÚCLEO
+# ===============================
+
+def resumo_status_nucleos(cubo, penalidades_media, percentuais, menor_melhor, metas_fixas, metas_setor):
+    """
+    Acum, Meta e status de cada (Penalidades, Regional, Nucleo), todos os
+    indicadores de uma vez a partir do cubo filtrado.
+
+    Reproduz a linha de núcleo do grid de cada indicador: Acum do setor é o
+    valor no último dia com dado do indicador (vazio conta 0 nos indicadores
+    de soma), Meta do setor vem de `metas_setor` (saída de
+    `calcular_metas_dinamicas`) ou de `metas_fixas`, e o núcleo soma os
+    setores (ou tira a média, para `penalidades_media`).
+    """
+    colunas = ["Penalidades", "Regional", "Nucleo", "Acum", "Meta", "Status"]
+    if cubo.empty:
+        return pd.DataFrame(columns=colunas)
+
+    df = cubo.index.to_frame(index=False)
+    for col in ["Penalidades", "Regional", "Nucleo", "Setor"]:
+        df[col] = df[col].astype(str)
+    eh_media = df["Penalidades"].isin(penalidades_media).to_numpy()
+    eh_percentual = df["Penalidades"].isin(percentuais).to_numpy()
+    soma = cubo["Soma"].to_numpy()
+    df["Valor"] = np.where(~eh_media, soma, np.where(eh_percentual, cubo["Media"].to_numpy(), soma / cubo["Linhas"].to_numpy()))
+    df = df[df["Valor"].notna()]
+
+    # Setores que aparecem no pivot do indicador e seu valor no último dia
+    chave = ["Penalidades", "Regional", "Nucleo", "Setor"]
+    ultima = df.groupby("Penalidades")["Data"].transform("max")
+    setores = df[chave].drop_duplicates().merge(
+        df.loc[df["Data"] == ultima, chave + ["Valor"]], on=chave, how="left"
+    ).rename(columns={"Valor": "Acum"})
+    media = setores["Penalidades"].isin(penalidades_media)
+    setores["Acum"] = setores["Acum"].mask(~media & setores["Acum"].isna(), 0.0)
+
+    # Meta por setor: dinâmica quando o indicador tem metas por setor, senão fixa
+    setores["Meta"] = pd.to_numeric(setores["Penalidades"].map(metas_fixas), errors="coerce")
+    if len(metas_setor):
+        # Junção pelo índice (Penalidades, Nucleo, Setor), sem montar chaves de texto
+        meta_setor = metas_setor.reindex(pd.MultiIndex.from_frame(setores[["Penalidades", "Nucleo", "Setor"]])).to_numpy()
+        tem_dinamica = setores["Penalidades"].isin(metas_setor.index.unique("Penalidades"))
+        setores["Meta"] = setores["Meta"].where(~tem_dinamica, meta_setor)
+
+    # Agregação do núcleo como no grid: soma (nula se nenhum valor) ou média
+    grupos = setores.groupby(["Penalidades", "Regional", "Nucleo"], sort=False)[["Acum", "Meta"]]
+    somas = grupos.sum(min_count=1)
+    medias = grupos.mean()
+    media_nucleo = somas.index.get_level_values("Penalidades").isin(penalidades_media)[:, None]
+    resumo = pd.DataFrame(np.where(media_nucleo, medias, somas), index=somas.index, columns=["Acum", "Meta"])
+    resumo = resumo.reset_index()
+    resumo["Status"] = calcular_status(
+        resumo["Acum"], resumo["Meta"], resumo["Penalidades"].isin(menor_melhor).to_numpy()
+    )
+    return resumo[colunas]
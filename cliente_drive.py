@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+# ===============================
+# CLIENTE DO GOOGLE DRIVE
+# ===============================
+# Um cliente por processo, compartilhado por sessões, meses e threads de
+# download. As bibliotecas do Google só são importadas na primeira chamada:
+# a página, o motor e a fonte local não pagam esse import.
+
+VARIAVEL_CREDENCIAIS = "GOOGLE_APPLICATION_CREDENTIALS_JSON"
+ESCOPOS_DRIVE = ["https://www.googleapis.com/auth/drive.readonly"]
+TIMEOUT_HTTP_SEGUNDOS = 60
+
+
+class ClienteDrive:
+    """
+    Credenciais e serviço do Drive montados uma vez. O httplib2 não é
+    thread-safe, então as conexões ficam num pool: cada requisição usa uma
+    conexão exclusiva (`with cliente.conexao() as http`), que depois volta ao
+    pool com o keep-alive aberto para a próxima, mesmo em outra thread. O
+    token é renovado sob lock quando expira, uma vez para todas as conexões.
+    """
+
+    def __init__(self, info_credenciais=None, timeout=TIMEOUT_HTTP_SEGUNDOS):
+        self._info_credenciais = info_credenciais
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._lock_token = threading.Lock()
+        self._credenciais = None
+        self._servico = None
+        self._livres = []
+
+    def servico(self):
+        """Serviço do Drive (só monta as requisições; elas rodam na conexão de `conexao()`)."""
+        if self._servico is None:
+            with self._lock:
+                if self._servico is None:
+                    from google.oauth2 import service_account
+                    from googleapiclient.discovery import build
+
+                    info = self._info_credenciais or json.loads(os.environ[VARIAVEL_CREDENCIAIS])
+                    self._credenciais = service_account.Credentials.from_service_account_info(
+                        info, scopes=ESCOPOS_DRIVE
+                    )
+                    # Documento de descoberta que acompanha a biblioteca: sem ida à rede
+                    self._servico = build(
+                        "drive", "v3", credentials=self._credenciais, cache_discovery=False, static_discovery=True
+                    )
+        return self._servico
+
+    def _renovar_token(self):
+        if self._credenciais.valid:
+            return
+        with self._lock_token:
+            if not self._credenciais.valid:
+                import httplib2
+                from google_auth_httplib2 import Request
+
+                self._credenciais.refresh(Request(httplib2.Http(timeout=self._timeout)))
+
+    def _nova_conexao(self):
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+
+        return AuthorizedHttp(self._credenciais, http=httplib2.Http(timeout=self._timeout))
+
+    @contextmanager
+    def conexao(self):
+        """Conexão autenticada exclusiva enquanto durar o `with`."""
+        self.servico()
+        self._renovar_token()
+        with self._lock:
+            http = self._livres.pop() if self._livres else None
+        if http is None:
+            http = self._nova_conexao()
+        try:
+            yield http
+        finally:
+            with self._lock:
+                self._livres.append(http)
+
+
+_cliente_processo = None
+_lock_processo = threading.Lock()
+
+
+def cliente_processo():
+    """ClienteDrive do processo, criado na primeira chamada."""
+    global _cliente_processo
+    with _lock_processo:
+        if _cliente_processo is None:
+            _cliente_processo = ClienteDrive()
+        return _cliente_processo
@@ -1,162 +1,163 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 from st_aggrid import AgGrid, GridOptionsBuilder, JsCode
 from datetime import date, timedelta, datetime
 from dateutil.relativedelta import relativedelta
-import math
 import json
-import io
 import os  # <--- FALTAVA ISSO
-from google.oauth2 import service_account  # <--- FALTAVA ISSO
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-import re # Adicione no topo do arquivo junto com os outros imports
+import time
+from calculos import ICONE_STATUS, STATUS_VERMELHO, calcular_cubo, filtrar_cubo, particionar_por_penalidade
+from fontes import ID_PASTA_DRIVE, fonte_configurada
+from indicadores import (
+    DECIMAIS_LIST, INDICADOR_TEMA_MAP, INTEIROS_LIST, LOWER_IS_BETTER_LIST, MOEDA_LIST, NOME_INDICADOR,
+    PENALIDADES_MEDIA, PERCENTUAIS_LIST, TEMA_ICONE_MAP,
+)
+from medicao import MEDICAO_INATIVA, Medicao, tabela_registros
+from motor import (
+    CargaPeriodo, calcular_metas, consolidar_totais, indicadores_presentes, montar_tabela_indicador, penalidades_do_tema,
+    recortar_meses, resumo_nucleos, separar_exibicao,
+)
+from ingestao import MAX_WORKERS_PADRAO, ConsolidadoIncremental, converter_datas
 
 # ===============================
-# FUNÇÕES DE APOIO
+# CARREGAMENTO DOS ARQUIVOS (FILTRADO E INCREMENTAL)
 # ===============================
 
-def limpar_nome_coluna(coluna):
-    """Remove colchetes dos nomes das colunas: [Data] -> Data"""
-    match = re.search(r'\[(.*?)\]', str(coluna))
-    return match.group(1) if match else str(coluna)
-
-def encontrar_tables(obj):
-    """Busca recursiva pela chave 'tables' no JSON (igual ao JS)"""
-    if isinstance(obj, dict):
-        if 'tables' in obj and isinstance(obj['tables'], list):
-            return obj['tables']
-        for key, value in obj.items():
-            resultado = encontrar_tables(value)
-            if resultado: return resultado
-    elif isinstance(obj, list):
-        for item in obj:
-            resultado = encontrar_tables(item)
-            if resultado: return resultado
-    return None
+@st.cache_resource(show_spinner=False)
+def fonte_dados(folder_id):
+    """Fonte dos arquivos e dos núcleos (Drive ou pasta local, ver fontes.fonte_configurada)."""
+    return fonte_configurada(folder_id)
 
-# ===============================
-# CARREGAMENTO DO DRIVE (FILTRADO)
-# ===============================
 
-@st.cache_data(ttl=86400, show_spinner="Buscando arquivos no Drive...")
-def carregar_jsons_drive_privado(folder_id, data_inicio, data_fim):
-    env_name = "GOOGLE_APPLICATION_CREDENTIALS_JSON"
-    if env_name not in os.environ:
-        st.error("Configuração de credenciais (JSON) não encontrada.")
-        return pd.DataFrame()
+@st.cache_data(ttl=300, show_spinner=False)
+def listar_arquivos_mes_fonte(identificador, ano, mes, _fonte):
+    """Listagem de um mês da fonte, memorizada por 5 min (trocar de mês não relista)."""
+    return _fonte.listar_mes(ano, mes)
 
-    try:
-        service_account_info = json.loads(os.environ[env_name])
-        creds = service_account.Credentials.from_service_account_info(
-            service_account_info,
-            scopes=["https://www.googleapis.com/auth/drive.readonly"]
-        )
-        service = build("drive", "v3", credentials=creds)
-
-        # Listar arquivos (pageSize aumentado para cobrir mais histórico e filtrar via código)
-        results = service.files().list(
-            q=f"'{folder_id}' in parents and trashed = false",
-            fields="files(id, name, mimeType)",
-            orderBy="modifiedTime desc",
-            pageSize=1000 
-        ).execute()
-        
-        files = results.get("files", [])
-        dfs = []
-
-        # Converter datas de entrada para comparação
-        t_inicio = pd.to_datetime(data_inicio)
-        t_fim = pd.to_datetime(data_fim)
-
-        for f in files:
-            if not f["name"].endswith(".json"): continue
-            
-            # 1. Extrai data do nome do arquivo para filtro preventivo
-            match_data = re.search(r'\d{4}-\d{2}-\d{2}', f['name'])
-            if not match_data: continue
-            
-            dt_arquivo = pd.to_datetime(match_data.group(0))
-
-            # 2. SÓ BAIXA SE ESTIVER DENTRO DO RANGE SELECIONADO (Otimização Real)
-            if t_inicio <= dt_arquivo <= t_fim:
-                try:
-                    request = service.files().get_media(fileId=f["id"])
-                    fh = io.BytesIO()
-                    downloader = MediaIoBaseDownload(fh, request)
-                    done = False
-                    while not done:
-                        _, done = downloader.next_chunk()
-
-                    fh.seek(0)
-                    data_json = json.load(fh)
-                    tables = encontrar_tables(data_json)
-                    
-                    if not tables: continue
-
-                    for table in tables:
-                        if "rows" in table and table["rows"]:
-                            df_temp = pd.DataFrame(table["rows"])
-                            # Limpa nomes de colunas: [Data] -> Data
-                            df_temp.columns = [limpar_nome_coluna(c) for c in df_temp.columns]
-                            
-                            # Se não tiver coluna data dentro, injeta a data do nome do arquivo
-                            if "Data" not in df_temp.columns:
-                                df_temp["Data"] = dt_arquivo
-                                
-                            dfs.append(df_temp)
-                except Exception:
-                    continue
-
-        return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
-    except Exception as e:
-        st.error(f"Erro na conexão com Drive: {e}")
-        return pd.DataFrame()
+
+# Um estado por mês (13 meses selecionáveis por fonte), com folga
+MAX_ESTADOS_MES = 24
+
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_ESTADOS_MES)
+def _consolidado_mes(identificador, ano, mes):
+    """
+    Estado incremental compartilhado entre sessões, um por (fonte, mês). A
+    chave não leva a data final da carga: no mês corrente o mesmo estado
+    recebe só os arquivos dos dias novos, e a listagem de cada sincronização
+    (até hoje) define o que entra.
+    """
+    return ConsolidadoIncremental()
+
+
+@st.cache_data(ttl=86400, show_spinner="Carregando totais do mês...")
+def carregar_totais_mes(identificador, ano, mes, versao_nucleos, _carga):
+    """Totais diários de um mês fechado lidos da partição em disco (None se ainda não existir)."""
+    # A leitura sem cache da carga do motor (CargaPagina.ler_particao passa por aqui)
+    return CargaPeriodo.ler_particao(_carga, ano, mes)
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def recortar_periodo(chave_dados, data_inicio, data_fim, _partes):
+    """(df, linhas_descartadas): meses do período juntos e recortados de `data_inicio` a `data_fim` (ver motor.recortar_meses)."""
+    return recortar_meses(_partes, data_inicio, data_fim)
 
 # ===============================
 # CONSOLIDAÇÃO FINAL (CHAMADA ÚNICA)
 # ===============================
 
 @st.cache_data(ttl=86400, show_spinner="Consolidando dados finais...")
-def preparar_dataframe_final(folder_id, data_inicio, data_fim):
-    # Passamos as datas para a função de carga filtrar o download
-    df_raw = carregar_jsons_drive_privado(folder_id, data_inicio, data_fim)
-    
-    if df_raw.empty:
-        return pd.DataFrame()
-
-    # Garantia contra KeyError: 'Data'
-    if "Data" not in df_raw.columns:
-        df_raw["Data"] = pd.NaT
-
-    df_raw["Data"] = pd.to_datetime(df_raw["Data"], errors="coerce")
-    
-    # Busca planilha de núcleos
-    df_n = carregar_nucleos_google()
-    
-    # Merge Inteligente
-    if "Chave2" in df_raw.columns and "Chave" in df_n.columns:
-        df_final = df_raw.merge(
-            df_n[["Chave", "Nucleo", "Regional", "Setor"]],
-            left_on="Chave2", right_on="Chave", how="left"
+def preparar_dataframe_final(folder_id, ano, mes, versao, _df_raw, versao_nucleos, _nucleos):
+    # `versao` identifica o conteúdo de `_df_raw` e `versao_nucleos` a dimensão
+    # (nenhum dos dois objetos entra no hash do cache): a consolidação só é refeita
+    # quando algum arquivo do mês ou a planilha de núcleos muda
+    return consolidar_totais(_df_raw, _nucleos)
+
+
+class CargaPagina(CargaPeriodo):
+    """
+    A carga do motor com os caches da página: listagem memorizada por 5 min,
+    estado incremental compartilhado entre sessões, partições e consolidação
+    em st.cache_data e os caches derivados limpos quando uma partição nova é
+    gravada.
+    """
+
+    def listar_mes(self, ano, mes, forcar):
+        if forcar:
+            listar_arquivos_mes_fonte.clear(self.fonte.identificador, ano, mes)
+        return listar_arquivos_mes_fonte(self.fonte.identificador, ano, mes, self.fonte)
+
+    def estado_mes(self, ano, mes):
+        return _consolidado_mes(self.fonte.identificador, ano, mes)
+
+    def ler_particao(self, ano, mes):
+        return carregar_totais_mes(self.fonte.identificador, ano, mes, self.nucleos.versao, self)
+
+    def consolidar_mes(self, ano, mes, versao, df_raw):
+        return preparar_dataframe_final(self.fonte.identificador, ano, mes, versao, df_raw, self.nucleos.versao, self.nucleos)
+
+    def particao_gravada(self, ano, mes):
+        carregar_totais_mes.clear(self.fonte.identificador, ano, mes, self.nucleos.versao)
+        # As entradas calculadas antes da partição existir não serão mais usadas
+        calcular_cubo_periodo.clear()
+        metas_dinamicas_periodo.clear()
+
+    def recortar(self, chave_dados, partes, data_inicio, data_fim):
+        return recortar_periodo(chave_dados, data_inicio, data_fim, partes)
+
+    def sincronizar_mes(self, estado, ano, mes, fim_carga, forcar, contadores):
+        # Downloads em paralelo (número de threads configurável via DRIVE_MAX_WORKERS);
+        # arquivos já vistos (mesmo id + modifiedTime) vêm do cache em disco; de
+        # cada tabela só ficam as colunas e penalidades que a página usa
+        with st.spinner("Buscando arquivos..."):
+            return super().sincronizar_mes(estado, ano, mes, fim_carga, forcar, contadores)
+
+
+def carregar_periodo(fonte, nucleos, data_inicio, data_fim, forcar=False, medicao=MEDICAO_INATIVA):
+    """
+    Consolidado (totais diários) de um período qualquer pela carga do motor
+    (motor.CargaPeriodo): meses fechados vêm da partição em disco; o mês
+    corrente, e os fechados ainda sem partição, vêm da fonte de forma
+    incremental. Mostra os avisos da carga e retorna (df, chave_dados), onde
+    chave_dados identifica o conteúdo para os caches derivados.
+    """
+    max_workers = int(os.environ.get("DRIVE_MAX_WORKERS", MAX_WORKERS_PADRAO))
+    carga = CargaPagina(fonte, nucleos, hoje=hoje, max_workers=max_workers, medicao=medicao)
+    df, falhas, contadores, chave_dados = carga.carregar(data_inicio, data_fim, forcar=forcar)
+
+    for falha in falhas:
+        if falha["id"] is None:
+            st.error(f"Erro ao carregar arquivos ({fonte.nome}): {falha['erro']}")
+    if contadores["datas_lentas"]:
+        st.caption(
+            f"ℹ️ {contadores['datas_lentas']} linha(s) com Data fora dos formatos conhecidos "
+            "(convertidas uma a uma)."
         )
-        if "Chave" in df_final.columns:
-            df_final.drop(columns=["Chave"], inplace=True)
-    else:
-        df_final = df_raw
-
-    # Conversão de Contagem
-    if "Contagem" in df_final.columns:
-        # MUDANÇA AQUI: Removemos o .fillna(0) para manter NaNs onde não tem dados
-        df_final["Contagem"] = pd.to_numeric(df_final["Contagem"], errors='coerce')
-    
-    # Mapeamento de Tema
-    if "Penalidades" in df_final.columns:
-        df_final["Tema"] = df_final["Penalidades"].map(INDICADOR_TEMA_MAP).fillna("Outros")
-    else:
-        df_final["Tema"] = "Outros"
-    
-    return df_final
+    if contadores["linhas_sobrepostas"]:
+        st.caption(
+            f"ℹ️ {contadores['linhas_sobrepostas']} total(is) diário(s) repetido(s) entre arquivos descartado(s) "
+            "(vale o arquivo mais recente)."
+        )
+    falhas_arquivo = [f for f in falhas if f["id"] is not None]
+    if falhas_arquivo:
+        detalhes = "\n".join(f"- {f['arquivo']}: {f['erro']}" for f in falhas_arquivo)
+        st.warning(f"⚠️ {len(falhas_arquivo)} arquivo(s) não puderam ser carregados:\n{detalhes}")
+    return df, chave_dados
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def calcular_cubo_periodo(chave_dados, _df_exib, _nucleos):
+    """Cubo de agregação do período; `chave_dados` identifica o conteúdo de `_df_exib` e a dimensão."""
+    return calcular_cubo(_df_exib, _nucleos)
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def metas_dinamicas_periodo(chave_dados, _df_merged, _nucleos, _dims_exib):
+    """
+    (metas_setor, parciais_nucleo) de todas as metas dinâmicas do período, numa
+    única passada (ver motor.calcular_metas). Núcleos e setores visíveis saem
+    do próprio período, então `chave_dados` basta como chave.
+    """
+    return calcular_metas(_df_merged, _nucleos, _dims_exib)
 
 # ===============================
 # CONFIGURAÇÃO DA PÁGINA
@@ -218,17 +219,8 @@ st.markdown('<div class="content">', unsafe_allow_html=True)
 # FUNÇÕES AUXILIARES
 # ===============================
 def converter_data_robusta(x):
-    if pd.isna(x) or x in ["", None]:
-        return pd.NaT
-    x = str(x).strip().replace("-", "/")
-    if ":" not in x:
-        x = x + " 00:00:00"
-    for fmt in ("%d/%m/%Y %H:%M:%S", "%Y/%m/%d %H:%M:%S", "%d/%m/%Y", "%Y/%m/%d"):
-        try:
-            return pd.to_datetime(x, format=fmt)
-        except:
-            continue
-    return pd.to_datetime(x, dayfirst=True, errors="coerce")
+    """Uma data isolada; para colunas inteiras use ingestao.converter_datas (vetorizado)."""
+    return converter_datas(pd.Series([x], dtype=object))[0].iloc[0]
 
 
 # @st.cache_data(ttl=3600, show_spinner=False)
@@ -240,7 +232,7 @@ def converter_data_robusta(x):
 #             df = pd.read_csv(url_csv, encoding="utf-8")
 #             df.columns = df.columns.str.strip()
 #             if "Data" in df.columns:
-#                 df["Data"] = df["Data"].apply(converter_data_robusta)
+#                 df["Data"], datas_lentas = converter_datas(df["Data"])
 #             if "Contagem" in df.columns:
 #                 df["Contagem"] = pd.to_numeric(
 #                     df["Contagem"].astype(str).str.replace(",", ".", regex=False),
@@ -255,28 +247,10 @@ def converter_data_robusta(x):
 #         return pd.DataFrame()
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def carregar_nucleos_google():
-    status_placeholder = st.sidebar.empty()
-    try:
-        sheet_id = "1N2C-g4RSV4nOaPOwqp_u85395p6xv0OiBs-akfxLTfk"
-        gid = "0"
-        url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
-        status_placeholder.info("Carregando dados dos Núcleos...")
-        df_nuc = pd.read_csv(url)
-        df_nuc.columns = df_nuc.columns.str.strip()
-        colunas_necessarias = ['Empresa', 'Setor', 'Nucleo', 'Regional']
-        colunas_faltantes = [col for col in colunas_necessarias if col not in df_nuc.columns]
-        if colunas_faltantes:
-            status_placeholder.error(f"❌ Colunas faltantes na planilha de Núcleos: {colunas_faltantes}")
-            return pd.DataFrame()
-        df_nuc["Chave"] = df_nuc["Empresa"].astype(str) + df_nuc["Setor"].astype(str)
-        status_placeholder.success("✅ Dados dos núcleos carregados!")
-        status_placeholder.empty()
-        return df_nuc
-    except Exception as e:
-        status_placeholder.error(f"❌ Erro ao carregar dados dos núcleos: {str(e)}")
-        return pd.DataFrame()
+@st.cache_resource(ttl=3600, show_spinner="Carregando dados dos Núcleos...")
+def tabela_nucleos(identificador, _fonte):
+    """Dimensão de núcleos da fonte, compartilhada entre sessões (ver nucleos.py)."""
+    return _fonte.carregar_nucleos()
 
 
 def _format_label(dt):
@@ -308,181 +282,228 @@ def generate_monthly_periods(min_date: date, today: date, max_data_date: date):
     return periods
 
 
-PERCENTUAIS_LIST = {"Meta VPML", "VPML", "Pontual%", "ControleEmbarque",
-                    "AcadDDS", "AcadFixo", "Identificacao%", "TripulacaoEscalada%", "BaixaConducao%",
-                    "MetaRecl%", "MetaAcid%", "VPML%", "Deslocamento%", "MetaTransito%", "%DesviodeEscala"}
-INTEIROS_LIST = {"DocsPendentes", "DocsVencidBloq", "Reclamacoes", "Acidentes"}
-DECIMAIS_LIST = {"NotaConducao", "EventosExcessos", "BaixaConducao", "Excessos Não Identificados"}
-MOEDA_LIST = {"MultasRegulatorias", "Multas Transito"}
-# Lista de indicadores onde "MENOR é MELHOR" (Exceder a meta é ruim/vermelho)
-LOWER_IS_BETTER_LIST = {"BaixaConducao%", "MultasRegulatorias", "DocsPendentes", "DocsVencidBloq",
-                        "Reclamacoes", "Acidentes", "VPML", "EventosExcessos", "Excessos Não Identificados", "Multas Transito", "%DesviodeEscala"}
 
+# Tipos de período (seletor na sidebar); intervalos e janelas podem atravessar meses
+PERIODO_MES = "Mês"
+PERIODO_INTERVALO = "Intervalo"
+PERIODO_JANELA = "Janela móvel"
+JANELAS_MOVEIS_DIAS = [7, 30, 90, 180, 365]
 
-def calcular_acum_ultimo_dia(df, penalidade):
-    cols_datas = [c for c in df.columns if c not in ["Regional", "Nucleo", "Setor", "Meta", "Acum"]]
-    if cols_datas:
-        ultimo_col = cols_datas[-1]
-        df["Acum"] = df[ultimo_col]
-    else:
-        df["Acum"] = pd.NA
-    cols = df.columns.tolist()
-    if "Acum" in cols:
-        cols.remove("Acum")
-        insert_pos = 3 if len(cols) >= 3 else len(cols)
-        cols.insert(insert_pos, "Acum")
-        df = df[cols]
-    return df
+# Medições de cada execução são acrescentadas a este arquivo (JSON lines), se definido
+ARQUIVO_MEDICAO = os.environ.get("DAILY_MEDICAO_JSONL")
 
+# Visões da página (seletor na sidebar)
+VISAO_INDICADORES = "Indicadores"
+VISAO_RESUMO = "Resumo por núcleo"
 
-def _to_float_or_none(x):
-    try:
-        if isinstance(x, str):
-            x = x.replace("%", "").replace(",", ".")
-        return float(x)
-    except:
-        return None
+
+# ===============================
+# JAVASCRIPT DOS GRIDS (ESTÁTICO)
+# ===============================
+# Montado uma vez por processo e igual para todos os indicadores: o tipo de
+# formatação e o sentido da meta chegam em gridOptions.context, e cada grid
+# declara as funções uma única vez em columnTypes (não por coluna).
+
+FORMATADOR_VALOR_JS = JsCode(r"""
+    function(params) {
+        var value = params.value;
+        if (value === null || value === undefined) return "";
+        var num_value = parseFloat(String(value));
+        if (isNaN(num_value)) return "";
+        var tipo = params.context ? params.context.tipo : "padrao";
+
+        if (tipo === "moeda") {
+            return num_value.toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' });
+        }
+        if (tipo === "percentual") {
+            return (num_value * 100).toFixed(2).replace(/0+$/, '').replace(/\.$/, '') + "%";
+        }
+        if (tipo === "inteiro") return Math.round(num_value).toString();
+        var str = tipo === "decimal" ? num_value.toFixed(2) : num_value.toFixed(3);
+        if (num_value !== 0 && str.indexOf('.') > -1) {
+            str = str.replace(/0+$/, '').replace(/\.$/, '');
+        }
+        if (num_value === 0) return "0";
+        return str;
+    }
+""")
+
+# Linhas de setor e GERAL: status já calculado (_st_<coluna>).
+# Linhas de grupo: agregado feito no navegador, compara com a Meta agregada.
+ESTILO_FAROL_JS = JsCode(r"""
+    function(params) {
+        var estilo = {'color': '#FF6868', 'fontWeight': 'bold'};
+        var ctx = params.context || {};
+        var campo = params.colDef.field;
+        if (params.data && params.data['_st_' + campo] !== undefined) {
+            return params.data['_st_' + campo] === ctx.statusVermelho ? estilo : null;
+        }
+        if (!params.node || !params.node.aggData) return null;
+        var valor = params.value;
+        var meta = params.node.aggData.Meta;
+        if (valor === null || valor === undefined || meta === null || meta === undefined) return null;
+        var pior = ctx.menorMelhor ? valor > meta : valor < meta;
+        return pior ? estilo : null;
+    }
+""")
+
+GET_ROW_ID_JS = JsCode("""
+    function(params) {
+        if (params.data.Regional === 'GERAL') return 'GERAL_ROW';
+        if (params.data._id !== undefined && params.data._id !== null) return String(params.data._id);
+        return Math.random().toString();
+    }
+""")
+
+
+def tipo_formatacao(pen):
+    """Tipo lido pelo FORMATADOR_VALOR_JS (mesma precedência das listas de formatação)."""
+    if pen in MOEDA_LIST: return "moeda"
+    if pen in PERCENTUAIS_LIST: return "percentual"
+    if pen in INTEIROS_LIST: return "inteiro"
+    if pen in DECIMAIS_LIST: return "decimal"
+    return "padrao"
+
+
+def montar_opcoes_grid(pen, df_data_raw, geral_aggrid_raw, menor_melhor):
+    """gridOptions do AgGrid de um indicador (colunas, formatação, agregação e linha GERAL)."""
+    data_agg_func = "avg" if pen in PENALIDADES_MEDIA else "sum"
+    meta_agg_func = "avg" if pen in PENALIDADES_MEDIA else "sum"
+    suppressAggFuncInHeader = True
+
+    gb = GridOptionsBuilder.from_dataframe(df_data_raw)
+    gb.configure_default_column(
+        resizable=True, suppressSizeToFit=False, wrapHeaderText=True, autoHeaderHeight=True
+    )
+    gb.configure_column("Regional", rowGroup=True, hide=True, width=120)
+    gb.configure_column("Nucleo", rowGroup=True, hide=True, width=120)
+    gb.configure_column("Setor", rowGroup=False, hide=True, width=120)
+
+    gb.configure_column(
+        "Meta", headerName="Meta", pinned="left", width=110, minWidth=110, suppressSizeToFit=True,
+        aggFunc=meta_agg_func, type=['numericColumn', 'rightAligned', 'valorIndicador']
+    )
+
+    gb.configure_column(
+        "Acum", headerName="Acum", pinned="left", width=110, minWidth=110, suppressSizeToFit=True,
+        aggFunc=data_agg_func, type=['numericColumn', 'rightAligned', 'valorIndicador', 'farol']
+    )
+
+    # Colunas auxiliares (_st_ do farol e _id da linha) vão para o navegador, mas ocultas
+    for col in df_data_raw.columns:
+        if col.startswith("_"): gb.configure_column(col, hide=True)
+
+    cols_data_in_pivot_aggrid = [c for c in df_data_raw.columns if
+                                 c not in ["Regional", "Nucleo", "Setor", "Meta", "Acum"]
+                                 and not c.startswith("_")]
+    for col in cols_data_in_pivot_aggrid:
+        gb.configure_column(
+            col, headerName=col, width=85, minWidth=80, maxWidth=100, suppressSizeToFit=False,
+            aggFunc=data_agg_func, type=['numericColumn', 'rightAligned', 'valorIndicador', 'farol']
+        )
+
+    autoGroupColumnDef = {
+        "headerName": "Regional / Núcleo / Setor", "pinned": "left", "width": 280,
+        "minWidth": 250, "maxWidth": 350,
+        "field": "Setor",  # <--- ADICIONE ESTA LINHA!
+        "cellRendererParams": {"suppressCount": True, "suppressLeafAfterColumns": False},
+        "wrapHeaderText": False, "autoHeaderHeight": False
+    }
+    gb.configure_grid_options(
+        autoGroupColumnDef=autoGroupColumnDef, pinnedBottomRowData=geral_aggrid_raw.to_dict('records'),
+        groupDefaultExpanded=0, suppressAggFuncInHeader=suppressAggFuncInHeader, rangeSelection=True,
+        getRowId=GET_ROW_ID_JS, allow_unsafe_jscode=True, suppressSizeToFit=False, ensureDomOrder=True,
+        groupSuppressGroupRows=False, groupIncludeFooter=False, groupSuppressBlankAndFloatingRow=True,
+        suppressAggAtRoot=True, suppressColumnVirtualisation=True, rowBuffer=20,
+        domLayout='autoHeight',  # <--- ADICIONE ESTA LINHA
+        columnTypes={
+            "valorIndicador": {"valueFormatter": FORMATADOR_VALOR_JS},
+            "farol": {"cellStyle": ESTILO_FAROL_JS},
+        },
+        context={"tipo": tipo_formatacao(pen), "menorMelhor": menor_melhor, "statusVermelho": STATUS_VERMELHO},
+    )
+    return gb.build()
+
+
+# Registros dos grids montados em reexecuções só do fragmento (o fragmento não
+# escreve na sidebar): aparecem no painel da execução seguinte
+CHAVE_MEDICAO_FRAGMENTOS = "medicao_fragmentos"
 
 
-def get_dot_color(penalidade, acum, meta):
-    def _to_float_or_none_local(x):
+def exportar_medicao(medicao, area):
+    """Acrescenta a medição a ARQUIVO_MEDICAO, se definido; falha vira aviso em `area`."""
+    if not ARQUIVO_MEDICAO:
+        return
+    try:
+        medicao.exportar(ARQUIVO_MEDICAO)
+    except OSError as e:
+        area.warning(f"Não foi possível gravar a medição em {ARQUIVO_MEDICAO}: {e}")
+
+
+def exibir_painel_performance(medicao, visivel):
+    """
+    Fecha a medição da execução: exporta para ARQUIVO_MEDICAO e, com o painel
+    ligado, mostra o resumo por etapa na sidebar com o download em JSON lines,
+    além dos grids abertos depois da execução anterior.
+    """
+    medicao.encerrar()
+    exportar_medicao(medicao, st.sidebar)
+    fragmentos = st.session_state.pop(CHAVE_MEDICAO_FRAGMENTOS, [])
+    if not visivel:
+        return
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        st.caption(f"Execução {medicao.execucao}: {medicao.decorrido():.2f}s (tabelas são medidas ao abrir)")
+        st.dataframe(medicao.tabela(), hide_index=True, width="stretch")
+        st.download_button(
+            "⬇️ Exportar JSONL", medicao.jsonl(), file_name=f"medicao_{medicao.execucao}.jsonl",
+            mime="application/x-ndjson",
+        )
+        if fragmentos:
+            st.caption("Tabelas abertas depois da execução anterior")
+            st.dataframe(tabela_registros(fragmentos), hide_index=True, width="stretch")
+
+
+@st.fragment
+def exibir_tabela_indicador(pen, df_data_raw, geral_aggrid_raw, menor_melhor, chave_grid, medicao=MEDICAO_INATIVA):
+    """
+    Tabela do indicador sob demanda: o AgGrid só é montado e enviado ao
+    navegador quando o usuário liga o toggle, e ligar/desligar reexecuta só
+    este fragmento, não a página inteira.
+    """
+    if not st.toggle("📋 Mostrar tabela", key=f"ver_{pen}"):
+        return
+    # Reexecução só do fragmento: a medição da página já foi encerrada e
+    # exportada, então o grid é medido numa medição própria, ligada a ela
+    medicao_grid = medicao.derivada() if medicao.encerrada else medicao
+    with medicao_grid.etapa("grid", indicador=pen) as registro:
+        grid_options = montar_opcoes_grid(pen, df_data_raw, geral_aggrid_raw, menor_melhor)
         try:
-            val = float(x)
-            if math.isnan(val): return None
-            return val
-        except (TypeError, ValueError):
-            return None
-
-    acum_val = _to_float_or_none_local(acum)
-    meta_val = _to_float_or_none_local(meta)
-
-    if meta_val is None: return "⚫"
-    if acum_val is not None and meta_val == 0 and acum_val == 0: return "🟢"
-    if acum_val is None: return "⚪"
-
-    if penalidade in LOWER_IS_BETTER_LIST:
-        if acum_val < meta_val:
-            return "🟢"
-        elif acum_val == meta_val:
-            return "🟡"
-        else:
-            return "🔴"
-    else:
-        if acum_val > meta_val:
-            return "🟢"
-        elif acum_val == meta_val:
-            return "🟡"
-        else:
-            return "🔴"
-
-
-nome_indicador = {
-    "DocsVencidBloq": "Documento Vencidos/Bloqueados",
-    "DocsPendentes": "Documento Pendentes",
-    "ControleEmbarque": "Controle de Embarque",
-    "VPML": "Veículo Parado com o Motor Ligado",
-    "NotaConducao": "Nota Condução",
-    "BaixaConducao%": "% Baixa Condução",
-    "AcadDDS": "DDS",
-    "AcadFixo": "Cursos Fixos",
-    "EventosExcessos": "Excessos de Velocidade",
-    "Pontual%": "Pontualidade",
-    "MultasRegulatorias": "Multas Regulatórias",
-    "TripulacaoEscalada%": "Escala de Tripulantes - OPTZ",
-    "Identificacao%": "Identificação de Condutor",
-    "Reclamacoes": "Reclamações",
-    "Acidentes": "Sinistros",
-    "PendIdentificacao": "Pendência de Identificacao",
-    "Multas Transito": "Multas de Trânsito",
-    "Excessos Não Identificados": "Excessos Não Identificados",
-    "Deslocamento%": "Deslocamento Identificado",
-    "%DesviodeEscala": "Desvio de Escala Programada",
-}
-
-INDICADOR_TEMA_MAP = {
-    "DocsVencidBloq": "Documentação",
-    "DocsPendentes": "Documentação",
-    "PenalDocsVencidBloq": "Documentação",
-    "PenalDocsPendentes": "Documentação",
-    "PenalDocs": "Documentação",
-    "ControleEmbarque": "Controle de Embarque",
-    "PenalControleEmbarque": "Controle de Embarque",
-    "VPML": "Veículo Parado com o Motor Ligado",
-    "PenalVPML": "Veículo Parado com o Motor Ligado",
-    "Meta VPML": "Veículo Parado com o Motor Ligado",
-    "VPML%": "Veículo Parado com o Motor Ligado",
-    "NotaConducao": "Histórico de Condução",
-    "PenalConducao": "Histórico de Condução",
-    "PenalNotaConducao": "Histórico de Condução",
-    "PenalBaixaConducao": "Histórico de Condução",
-    "BaixaConducao": "Histórico de Condução",
-    "BaixaConducao%": "Histórico de Condução",
-    "PenalAcadDDS": "Treinamentos EAD",
-    "AcadDDS": "Treinamentos EAD",
-    "PenalAcadFixo": "Treinamentos EAD",
-    "AcadFixo": "Treinamentos EAD",
-    "PenalAcademia": "Treinamentos EAD",
-    "EventosExcessos": "Excessos de Velocidade",
-    "PenalExcessos": "Excessos de Velocidade",
-    "PenalPontualidade": "Pontualidade",
-    "Pontual%": "Pontualidade",
-    "MetaReg%": "Multas Regulatórias",
-    "MultasRegulatorias": "Multas Regulatórias",
-    "MetaMultasReg": "Multas Regulatórias",
-    "PenalMultasReg": "Multas Regulatórias",
-    "PenalTripulacao": "Escala de Tripulantes - OPTZ",
-    "TripulacaoEscalada%": "Escala de Tripulantes - OPTZ",
-    "PenalIdentificacao": "Identificação de Condutor",
-    "PenalIdentCondutor": "Identificação de Condutor",
-    "Identificacao%": "Identificação de Condutor",
-    "PendIdentificacao": "Identificação de Condutor",
-    "Reclamacoes": "Reclamações",
-    "MetaReclamacoes": "Reclamações",
-    "MetaRecl%": "Reclamações",
-    "PenalReclamacoes": "Reclamações",
-    "Acidentes": "Sinistros",
-    "PenalAcidentes": "Sinistros",
-    "MetaAcidentes": "Sinistros",
-    "MetaAcid%": "Sinistros",
-    "MotsAtivos": "Geral",
-    "KmRodado": "Geral",
-    "ViagensProg": "Geral",
-    "Vendas": "Geral",
-    "Multas Transito": "Multas de Trânsito",
-    "PenalMultastransito": "Multas de Trânsito",
-    "MetaTransito%": "Multas de Trânsito",
-    "Meta_MultasTransito": "Multas de Trânsito",
-    "Excessos Não Identificados": "Excessos de Velocidade",
-    "PenalExcessosNãoIdentificados": "Excessos de Velocidade",
-    "Deslocamento%": "Identificação de Condutor",
-    "PenalDeslocamento": "Identificação de Condutor",
-    "%DesviodeEscala": "Escala de Tripulantes - OPTZ",
-    "PenalDesviodeEscala": "Escala de Tripulantes - OPTZ",
-}
+            AgGrid(
+                df_data_raw,
+                gridOptions=grid_options,
+                # height=400,
+                fit_columns_on_grid_load=True,  # <--- MUDANÇA: de False para True (ajuda no trigger)
+                enable_enterprise_modules=True,
+                key=chave_grid,
+                allow_unsafe_jscode=True,
+            )
+        except Exception as e:
+            st.error(f"Erro tabela {pen}: {e}")
+        registro["linhas"] = len(df_data_raw)
+    if not medicao_grid.ativa:
+        return
+    # Tamanho aproximado do que vai ao navegador (linhas + gridOptions), fora do tempo medido
+    registro["bytes"] = len(df_data_raw.to_json(orient="records")) + len(json.dumps(grid_options, default=str))
+    st.caption(f"⏱️ grid montado em {registro['segundos']:.3f}s · {registro['bytes'] / 1024:,.0f} KB")
+    if medicao_grid is not medicao:
+        exportar_medicao(medicao_grid, st)
+        st.session_state.setdefault(CHAVE_MEDICAO_FRAGMENTOS, []).extend(medicao_grid.registros())
+
+
 
-# =======================================================
-# NOVO DICIONÁRIO DE ÍCONES POR TEMA
-# =======================================================
-TEMA_ICONE_MAP = {
-    "Documentação": "📄",
-    "Controle de Embarque": "🚦",
-    "Veículo Parado com o Motor Ligado": "⛽",
-    "Histórico de Condução": "🚌",
-    "Treinamentos EAD": "🎓",
-    "Excessos de Velocidade": "🚨",
-    "Pontualidade": "⏱️",
-    "Multas Regulatórias": "⚠️💵",
-    "Multas de Trânsito": "🚦🧾🚗",
-    "Escala de Tripulantes - OPTZ": "👥",
-    "Identificação de Condutor": "👤",
-    "Reclamações": "🗣️",
-    "Sinistros": "💥",
-    "Geral": "⚙️",
-    "Outros": "❓",
-}
 
 # ===============================
-# SIDEBAR - SELETOR DE MÊS (DAILY)
+# SIDEBAR - SELETOR DE PERÍODO (DAILY)
 # ===============================
 with st.sidebar:
     st.header("🔍 Período de Análise")
@@ -490,11 +511,16 @@ with st.sidebar:
     hoje = date.today()
     # Definimos um início padrão (1 ano atrás)
     data_inicio_historico = hoje - relativedelta(years=1)
-    
-    # Geramos o mapa de períodos
-    period_map = generate_monthly_periods(data_inicio_historico, hoje, hoje)
-    
-    if period_map:
+
+    tipo_periodo = st.radio("Tipo de período", [PERIODO_MES, PERIODO_INTERVALO, PERIODO_JANELA], horizontal=True)
+
+    if tipo_periodo == PERIODO_MES:
+        # Geramos o mapa de períodos
+        period_map = generate_monthly_periods(data_inicio_historico, hoje, hoje)
+
+        if not period_map:
+            st.error("Não foi possível gerar a lista de meses.")
+            st.stop()
         period_labels = list(period_map.keys())
         periodo_selecionado = st.selectbox(
             "Selecione o Mês", 
@@ -504,35 +530,69 @@ with st.sidebar:
         
         # Aqui o código define as datas baseadas no mês escolhido
         start_date, end_date = period_map[periodo_selecionado]
-        st.caption(f"Período: **{start_date.strftime('%d/%m/%Y')}** a **{end_date.strftime('%d/%m/%Y')}**")
+    elif tipo_periodo == PERIODO_INTERVALO:
+        intervalo = st.date_input(
+            "Selecione o intervalo",
+            value=(hoje - timedelta(days=29), hoje),
+            min_value=data_inicio_historico,
+            max_value=hoje,
+            format="DD/MM/YYYY",
+        )
+        if len(intervalo) < 2:
+            st.info("Selecione a data final do intervalo.")
+            st.stop()
+        start_date, end_date = intervalo
     else:
-        st.error("Não foi possível gerar a lista de meses.")
-        st.stop()
+        dias_janela = st.selectbox(
+            "Selecione a janela", JANELAS_MOVEIS_DIAS, index=1, format_func=lambda d: f"Últimos {d} dias"
+        )
+        start_date, end_date = hoje - timedelta(days=dias_janela - 1), hoje
+
+    st.caption(f"Período: **{start_date.strftime('%d/%m/%Y')}** a **{end_date.strftime('%d/%m/%Y')}**")
 
 # ===============================
 # CARREGAR DADOS (CHAMADA ÚNICA COM AS DATAS DO MÊS)
 # ===============================
-ID_PASTA_DRIVE = "1kQ0Hs1A_6JKUOXleBScT1C1ehpWM5_Vp"
+try:
+    fonte = fonte_dados(ID_PASTA_DRIVE)
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+
+with st.sidebar:
+    forcar_atualizacao = st.button("🔄 Atualizar dados", help="Busca agora arquivos novos ou alterados na fonte")
+    painel_performance = st.toggle(
+        "⏱️ Painel de performance", help="Tempo, linhas e bytes de cada etapa desta execução"
+    )
+
+# Medição da execução: ligada pelo painel ou, em produção, por DAILY_MEDICAO_JSONL
+medicao = Medicao(ativa=painel_performance or bool(ARQUIVO_MEDICAO))
 
-# A função recebe as datas geradas pelo seletor de mês acima
-df_merged = preparar_dataframe_final(ID_PASTA_DRIVE, start_date, end_date)
+try:
+    nucleos = tabela_nucleos(fonte.identificador, fonte)
+except Exception as e:
+    st.error(f"❌ Erro ao carregar dados dos núcleos: {e}")
+    exibir_painel_performance(medicao, painel_performance)
+    st.stop()
+if fonte.nome == "drive" and nucleos.origem == "local":
+    st.sidebar.warning("Planilha de núcleos indisponível; usando a cópia local (dBase Nucleos.xlsx).")
+
+# Totais diários do período: meses fechados vêm das partições em disco, sem ir à
+# fonte; do mês corrente só os dias novos ou alterados são baixados
+df_merged, chave_dados = carregar_periodo(
+    fonte, nucleos, start_date, end_date, forcar=forcar_atualizacao, medicao=medicao
+)
 
 if df_merged.empty:
-    st.warning("Nenhum dado encontrado para o mês selecionado.")
+    st.warning("Nenhum dado encontrado para o período selecionado.")
+    exibir_painel_performance(medicao, painel_performance)
     st.stop()
 # ===============================
 # PREPARAR DATAFRAME DE EXIBIÇÃO
 # ===============================
-penalidades_ocultas = {
-    "Meta VPML", "MetaReclamacoes", "MetaAcidentes", "MetaMultasReg",
-    "MetaAcid%", "VPML%", "MetaReg%", "MetaRecl%", "ViagensProg",
-    "MotsAtivos", "KmRodado", "Vendas", "BaixaConducao", "MetaTransito%", "Meta_MultasTransito"
-}
-
-# Criamos o df_exib a partir do que foi carregado no período
-df_exib = df_merged[~df_merged["Penalidades"].str.startswith("Penal", na=False)]
-df_exib = df_exib[~df_exib["Penalidades"].isin(penalidades_ocultas)]
-df_exib["Setor"] = df_exib["Setor"].fillna("-")
+# Penalidades que viram tabela e Regional/Núcleo/Setor só dos códigos presentes
+# (para filtros e metas), sem tocar nas linhas
+df_exib, dims_exib = separar_exibicao(df_merged, nucleos)
 
 # ===============================
 # CONTINUAÇÃO DOS FILTROS NA SIDEBAR
@@ -544,26 +604,37 @@ with st.sidebar:
     penalidades_visiveis = sorted(df_exib["Penalidades"].dropna().unique())
     penalidades_sel = st.multiselect("Penalidades", penalidades_visiveis, placeholder="Selecione uma opção")
 
-    regional_sel = st.multiselect("Regional", sorted(df_exib["Regional"].dropna().unique()), placeholder="Selecione uma opção")
+    regional_sel = st.multiselect("Regional", sorted(dims_exib["Regional"].dropna().unique()), placeholder="Selecione uma opção")
+
+    nucleo_sel = st.multiselect("Núcleo", sorted(dims_exib["Nucleo"].dropna().unique()), placeholder="Selecione uma opção")
 
-    nucleo_sel = st.multiselect("Núcleo", sorted(df_exib["Nucleo"].dropna().unique()), placeholder="Selecione uma opção")
+    setor_sel = st.multiselect("Setor", sorted(dims_exib["Setor"].dropna().unique()), placeholder="Selecione uma opção")
 
-    setor_sel = st.multiselect("Setor", sorted(df_exib["Setor"].dropna().unique()), placeholder="Selecione uma opção")
+    visao = st.radio("Visão", [VISAO_INDICADORES, VISAO_RESUMO], horizontal=True)
 
 # ===============================
-# APLICAÇÃO DOS FILTROS NO DATAFRAME FINAL
+# CUBO AGREGADO + APLICAÇÃO DOS FILTROS
 # ===============================
-df_filt = df_exib.copy()
-if tema_sel: df_filt = df_filt[df_filt["Tema"].isin(tema_sel)]
-if penalidades_sel: df_filt = df_filt[df_filt["Penalidades"].isin(penalidades_sel)]
-if nucleo_sel: df_filt = df_filt[df_filt["Nucleo"].isin(nucleo_sel)]
-if regional_sel: df_filt = df_filt[df_filt["Regional"].isin(regional_sel)]
-if setor_sel: df_filt = df_filt[df_filt["Setor"].isin(setor_sel)]
+# O cubo (Penalidade, Regional, Núcleo, Setor, Data) é calculado uma vez por período
+# carregado; os filtros só recortam o cubo, sem varrer as linhas brutas de novo.
+with medicao.etapa("cubo") as registro:
+    cubo = calcular_cubo_periodo(chave_dados, df_exib, nucleos)
+    registro["linhas"] = len(cubo)
+
+penalidades_tema = penalidades_do_tema(cubo, tema_sel) if tema_sel else None
+cubo_filt = filtrar_cubo(cubo, [
+    ("Penalidades", penalidades_tema),
+    ("Penalidades", penalidades_sel),
+    ("Nucleo", nucleo_sel),
+    ("Regional", regional_sel),
+    ("Setor", setor_sel),
+])
 
 # Não precisa filtrar data de novo aqui, pois a função preparar_dataframe_final já trouxe apenas o período certo!
 
-if df_filt.empty:
+if cubo_filt.empty or (tema_sel and not penalidades_tema):
     st.warning("⚠️ Nenhum dado encontrado para os filtros selecionados.")
+    exibir_painel_performance(medicao, painel_performance)
     st.stop()
 try:
     filter_tuple = (
@@ -581,53 +652,35 @@ except Exception:
 # ===============================
 # METAS DINÂMICAS
 # ===============================
-metas_dinamicas = {
-    "VPML": "Meta VPML", "Reclamacoes": "MetaReclamacoes",
-    "Acidentes": "MetaAcidentes", "MultasRegulatorias": "MetaMultasReg", "Multas Transito": "Meta_MultasTransito"
-}
-metas_por_setor = {}
-for pen, nome_meta in metas_dinamicas.items():
-    df_meta = df_merged[df_merged["Penalidades"] == nome_meta].copy()
-    nucleos_visiveis = df_exib["Nucleo"].unique().tolist()
-    setores_visiveis = df_exib["Setor"].unique().tolist()
-    df_meta = df_meta[df_meta["Nucleo"].isin(nucleos_visiveis) & df_meta["Setor"].isin(setores_visiveis)]
-    df_meta["Data"] = pd.to_datetime(df_meta["Data"], errors="coerce")
-    df_meta = df_meta[(df_meta["Data"].dt.date >= start_date) & (df_meta["Data"].dt.date <= end_date)]
-    if df_meta.empty: continue
-
-    if pen == "VPML":
-        df_meta_agg = df_meta.groupby(["Nucleo", "Setor", "Data"], as_index=False)["Contagem"].mean()
-    else:
-        df_meta_agg = df_meta.groupby(["Nucleo", "Setor", "Data"], as_index=False)["Contagem"].sum()
-
-    ultima_data_periodo = df_meta_agg["Data"].max()
-    df_meta_ult = df_meta_agg[df_meta_agg["Data"] == ultima_data_periodo]
-    df_meta_ult["Chave_Setor"] = df_meta_ult["Nucleo"].astype(str) + "_" + df_meta_ult["Setor"].astype(str)
-    metas_por_setor[pen] = df_meta_ult.set_index("Chave_Setor")["Contagem"].to_dict()
+# Metas por setor e parciais do GERAL de todas as metas, calculadas uma vez por período
+with medicao.etapa("metas") as registro:
+    metas_setor, parciais_metas = metas_dinamicas_periodo(chave_dados, df_merged, nucleos, dims_exib)
+    registro["linhas"] = len(metas_setor)
 
-penalidades_media = {
-    "Meta VPML", "VPML", "VPML%", "MetaAcid%", "MetaRecl%", "MetaReg%",
-    "Pontual%", "ControleEmbarque", "AcadDDS", "AcadFixo", "Identificacao%",
-    "TripulacaoEscalada%", "BaixaConducao%", "NotaConducao", "BaixaConducao", "EventosExcessos", "Excessos Não Identificados", "Deslocamento%", "%DesviodeEscala"
-}
+# Indicadores presentes no cubo filtrado, na ordem fixa (nome de exibição)
+penalidades_para_exibir = indicadores_presentes(cubo_filt)
+# Fatias do cubo por indicador, numa única passada
+fatias_cubo = particionar_por_penalidade(cubo_filt)
 
 # =======================================================
-# ORDEM FIXA DOS INDICADORES
+# VISÃO RESUMO: INDICADOR x NÚCLEO EM UMA ÚNICA TABELA
 # =======================================================
-
-# 1. Definir uma lista mestra de indicadores a serem exibidos com ordem estável
-penalidades_candidatas = [
-    p for p in INDICADOR_TEMA_MAP.keys()
-    if not p.startswith("Penal") and p not in penalidades_ocultas
-]
-# Ordena por nome de exibição para uma ordem estável
-penalidades_ordem_fixa = sorted(penalidades_candidatas, key=lambda p: nome_indicador.get(p, p))
-
-# 2. Identificar quais indicadores da lista fixa estão presentes no DF filtrado
-penalidades_no_df_filtrado = set(df_filt["Penalidades"].dropna().unique())
-penalidades_para_exibir = [
-    p for p in penalidades_ordem_fixa if p in penalidades_no_df_filtrado
-]
+if visao == VISAO_RESUMO:
+    with medicao.etapa("resumo") as registro:
+        resumo = resumo_nucleos(cubo_filt, metas_setor)
+        registro["linhas"] = len(resumo)
+    matriz = resumo.pivot(index=["Regional", "Nucleo"], columns="Penalidades", values="Status")
+    matriz = matriz[[p for p in penalidades_para_exibir if p in matriz.columns]]
+    status = matriz.to_numpy(dtype="float64")
+    tabela = pd.DataFrame(
+        np.where(np.isnan(status), "", ICONE_STATUS[np.nan_to_num(status).astype(int)]),
+        index=matriz.index, columns=[NOME_INDICADOR.get(p, p) for p in matriz.columns],
+    )
+    st.caption("🟢 melhor que a meta · 🟡 na meta · 🔴 pior que a meta · ⚪ sem dado · ⚫ sem meta")
+    st.dataframe(tabela, width="stretch")
+    st.markdown('</div>', unsafe_allow_html=True)
+    exibir_painel_performance(medicao, painel_performance)
+    st.stop()
 
 # =======================================================
 # LOOP PRINCIPAL (TABELAS) - AGRUPADO POR TEMA E COM ÍCONES
@@ -663,294 +716,41 @@ for tema in ordem_temas_fixa:
         # Loop para CADA INDICADOR
         for i, pen in enumerate(indicadores_do_tema):
 
-            sub = df_filt[df_filt["Penalidades"] == pen].copy()
-            if sub.empty: continue
-
-            # ============================================================
-            # LÓGICA DE TRATAMENTO DE NULOS (SOLUÇÃO DO PROBLEMA)
-            # ============================================================
-            # Regra:
-            # 1. Se for Média de Porcentagem (ex: VPML%):
-            #    NÃO preencher com 0. O NaN será ignorado no cálculo da média (pivot_table).
-            # 2. Se for Média de Inteiros/Decimais (ex: EventosExcessos) OU Soma:
-            #    Preencher NaN com 0, pois ausência de dado significa "0 ocorrências".
-            
-            eh_media = pen in penalidades_media
-            eh_percentual = pen in PERCENTUAIS_LIST
-
-            if eh_media and eh_percentual:
-                # Mantém NaN na coluna Contagem para não derrubar a média
-                pass 
-            else:
-                # Para Somas ou Médias de contagem (como EventosExcessos), vazio = 0
-                sub["Contagem"] = sub["Contagem"].fillna(0)
-
-            # Define a função de agregação
-            aggfunc = "mean" if eh_media else "sum"
-
+            # Pivot, Meta, Acum, linha GERAL e status (ver motor.montar_tabela_indicador)
+            inicio_indicador = time.perf_counter()
             try:
-                # O parâmetro dropna=True (padrão) do pivot_table já ignora NaNs nas médias
-                pivot = sub.pivot_table(
-                    index=["Regional", "Nucleo", "Setor"],
-                    columns="Data", values="Contagem", aggfunc=aggfunc, fill_value=pd.NA
-                ).sort_index(axis=1)
-                if "Data" in pivot.columns: pivot = pivot.drop(columns=["Data"])
-                pivot.columns = [col.strftime("%d/%m") for col in pivot.columns]
-                df_data_raw = pivot.reset_index()
-                if "Data" in df_data_raw.columns: df_data_raw = df_data_raw.drop(columns=["Data"])
-                colunas_duplicadas = [c for c in df_data_raw.columns if c.lower().strip() == "data"]
-                if colunas_duplicadas: df_data_raw = df_data_raw.drop(columns=colunas_duplicadas)
-                df_data_raw = df_data_raw.loc[:, ~df_data_raw.columns.duplicated()]
-                df_data_raw = df_data_raw[
-                    [c for c in df_data_raw.columns if not ("00:00" in str(c) or "Data" in str(c))]]
+                resultado = montar_tabela_indicador(
+                    pen, fatias_cubo.get(pen), metas_setor, parciais_metas, nucleos, medicao
+                )
             except Exception as e:
                 st.error(f"Erro pivot {pen}: {e}")
                 continue
-
-            cols_data_in_pivot = [c for c in df_data_raw.columns if c not in ["Regional", "Nucleo", "Setor"]]
-            for c in cols_data_in_pivot: df_data_raw[c] = pd.to_numeric(df_data_raw[c], errors='coerce')
-
-            if pen in penalidades_media:
-                cols_to_fill_mean = [c for c in cols_data_in_pivot if c not in ["Meta", "Acum"]]
-                for c in cols_to_fill_mean: df_data_raw[c] = df_data_raw[c].mask(pd.isna(df_data_raw[c]), None)
-            else:
-                cols_to_fill = [c for c in df_data_raw.columns if c not in ["Regional", "Nucleo", "Setor"]]
-                for c in cols_to_fill: df_data_raw[c] = df_data_raw[c].fillna(0.0)
-
-            df_data_raw = calcular_acum_ultimo_dia(df_data_raw, pen)
-            df_data_raw["Chave_Setor"] = df_data_raw["Nucleo"].astype(str) + "_" + df_data_raw["Setor"].astype(str)
-
-            if pen in metas_por_setor:
-                df_data_raw["Meta"] = df_data_raw["Chave_Setor"].map(metas_por_setor.get(pen, {})).fillna(pd.NA)
-            else:
-                metas_fixas = {
-                    "Pontual%": 0.8, "ControleEmbarque": 0.95, "AcadDDS": 0.98, "AcadFixo": 0.9,
-                    "BaixaConducao%": 0.1, "DocsPendentes": 0, "DocsVencidBloq": 0,
-                    "EventosExcessos": 0.02, "Identificacao%": 0.98, "TripulacaoEscalada%": 0.96,
-                    "NotaConducao": 70.0, "Deslocamento%": 0.90, "%DesviodeEscala": 0.15, "Excessos Não Identificados": 0.25
-                }
-                df_data_raw["Meta"] = metas_fixas.get(pen, pd.NA)
-
-            df_data_raw["Meta"] = pd.to_numeric(df_data_raw["Meta"], errors='coerce')
-            df_data_raw.drop(columns=["Chave_Setor"], inplace=True)
-
-            cols_data_to_check = [c for c in df_data_raw.columns if c not in ["Regional", "Nucleo", "Setor"]]
-            df_data_raw['has_data'] = df_data_raw[cols_data_to_check].notna().any(axis=1)
-            df_data_raw = df_data_raw[df_data_raw['has_data']].drop(columns=['has_data'])
-
-            if df_data_raw.empty:
+            if resultado is None:
                 continue
-
-            # Cálculo GERAL
-            cols_data_in_pivot_geral = [c for c in df_data_raw.columns if
-                                        c not in ["Regional", "Nucleo", "Setor", "Meta", "Acum"]]
-            if pen in penalidades_media:
-                geral_vals = df_data_raw[cols_data_in_pivot_geral].apply(
-                    lambda col: col[col.notna()].mean() if len(col[col.notna()]) > 0 else pd.NA, axis=0)
-            else:
-                geral_vals = df_data_raw[cols_data_in_pivot_geral].apply(lambda col: col.sum(), axis=0)
-
-            geral = pd.DataFrame([geral_vals]).astype(float)
-            geral["Regional"] = "GERAL"
-            geral["Nucleo"] = "-"
-            geral["Setor"] = "-"
-            geral = geral[["Regional", "Nucleo", "Setor"] + geral_vals.index.tolist()]
-
-            if pen in metas_dinamicas:
-                df_meta_geral = df_merged[df_merged["Penalidades"] == metas_dinamicas.get(pen, "")].copy()
-                df_meta_geral["Data"] = pd.to_datetime(df_meta_geral["Data"], errors="coerce")
-                if not df_meta_geral.empty:
-                    nucleos_visiveis = df_data_raw["Nucleo"].unique().tolist()
-                    df_meta_geral = df_meta_geral[df_meta_geral["Nucleo"].isin(nucleos_visiveis)]
-                    df_meta_geral = df_meta_geral[
-                        (df_meta_geral["Data"].dt.date >= start_date) & (df_meta_geral["Data"].dt.date <= end_date)]
-                    if not df_meta_geral.empty:
-                        ultima_data = df_meta_geral["Data"].max()
-                        df_meta_geral = df_meta_geral[df_meta_geral["Data"] == ultima_data]
-                        meta_geral = df_meta_geral["Contagem"].mean() if pen == "VPML" else df_meta_geral[
-                            "Contagem"].sum()
-                    else:
-                        meta_geral = pd.NA
-                else:
-                    meta_geral = pd.NA
-            else:
-                meta_geral = metas_fixas.get(pen, pd.NA)
-
-            geral["Meta"] = meta_geral
-            cols_datas_geral = [c for c in geral.columns if c not in ["Regional", "Nucleo", "Setor", "Meta"]]
-            geral["Acum"] = geral[cols_datas_geral[-1]] if cols_datas_geral else pd.NA
-
-            cols = geral.columns.tolist()
-            for col in ["Meta", "Acum"]:
-                if col in cols: cols.remove(col)
-            cols.insert(3, "Acum")
-            cols.insert(4, "Meta")
-            geral = geral[cols]
+            df_data_raw, geral = resultado
+            menor_melhor = pen in LOWER_IS_BETTER_LIST
 
             geral_aggrid_raw = geral.copy()
             for col in geral_aggrid_raw.columns:
                 geral_aggrid_raw[col] = geral_aggrid_raw[col].mask(pd.isna(geral_aggrid_raw[col]), None)
 
-            media_acum = geral["Acum"].apply(_to_float_or_none).dropna().mean()
-            media_meta = geral["Meta"].apply(_to_float_or_none).dropna().mean()
-            cor = get_dot_color(pen, media_acum, media_meta)
-            display_pen = nome_indicador.get(pen, pen)
+            cor = ICONE_STATUS[geral["_st_Acum"].iloc[0]]
+            display_pen = NOME_INDICADOR.get(pen, pen)
+            # Pivot, metas, GERAL e status do indicador (o grid é medido à parte)
+            medicao.registrar(
+                "indicador", time.perf_counter() - inicio_indicador, indicador=pen, linhas=len(df_data_raw)
+            )
 
-            # Expander para o Indicador/Penalidade
+            # Expander para o Indicador/Penalidade: o farol já está no rótulo;
+            # a tabela só é montada quando pedida (ver exibir_tabela_indicador)
             with st.expander(f"{cor} {display_pen}", expanded=False):
-
-                percentuais_js = json.dumps(list(PERCENTUAIS_LIST))
-                inteiros_js = json.dumps(list(INTEIROS_LIST))
-                decimais_js = json.dumps(list(DECIMAIS_LIST))
-                moeda_js = json.dumps(list(MOEDA_LIST))
-                lower_is_better_js = json.dumps(list(LOWER_IS_BETTER_LIST))
-
-                # NOVO: JsCode para forçar o redimensionamento
-                onGridReady_js = JsCode("""
-                                    function(params) {
-                                        // Força o grid a recalcular seu tamanho assim que é renderizado
-                                        params.api.sizeColumnsToFit();
-                                    }
-                                """)
-
-                formatter_js = f"""
-                                    function(params) {{
-                                        var value = params.value; 
-                                        var penalidade = "{pen}".trim();
-                                        var num_value;
-                                        if (value === null || value === undefined) return ""; 
-                                        try {{ num_value = parseFloat(String(value)); }} catch (e) {{ return ""; }}
-                                        if (isNaN(num_value)) return ""; 
-                                        var percentuais = {percentuais_js};
-                                        var inteiros = {inteiros_js};
-                                        var decimais = {decimais_js};
-                                        var moedas = {moeda_js}; 
-
-                                        if (moedas.includes(penalidade)) {{
-                                            return num_value.toLocaleString('pt-BR', {{ style: 'currency', currency: 'BRL' }});
-                                        }}
-                                        if (percentuais.includes(penalidade)) {{
-                                            return (num_value * 100).toFixed(2).replace(/0+$/, '').replace(/\.$/, '') + "%";
-                                        }}
-                                        if (inteiros.includes(penalidade)) return Math.round(num_value).toString();
-                                        var str = decimais.includes(penalidade) ? num_value.toFixed(2) : num_value.toFixed(3);
-                                        if (num_value !== 0 && str.indexOf('.') > -1) {{
-                                            str = str.replace(/0+$/, '').replace(/\.$/, '');
-                                        }}
-                                        if (num_value === 0) return "0";
-                                        return str;
-                                    }}
-                                    """
-
-                cell_style_js = f"""
-                                    function(params) {{
-                                        var penalidade = "{pen}".trim();
-                                        var lowerIsBetter = {lower_is_better_js};
-
-                                        function parseVal(v) {{
-                                            if (v === null || v === undefined) return null;
-                                            if (typeof v === 'number') return v;
-                                            return parseFloat(String(v).replace(',', '.').replace('%', ''));
-                                        }}
-
-                                        var acum = parseVal(params.value);
-
-                                        var meta = null;
-                                        if (params.node && params.node.aggData && params.node.aggData.Meta !== undefined) {{
-                                             meta = parseVal(params.node.aggData.Meta);
-                                        }} else if (params.data && params.data.Meta !== undefined) {{
-                                             meta = parseVal(params.data.Meta);
-                                        }}
-
-                                        if (acum === null || meta === null) return null;
-
-                                        if (lowerIsBetter.includes(penalidade)) {{
-                                            if (acum > meta) {{
-                                                return {{'color': '#FF6868', 'fontWeight': 'bold'}}; 
-                                            }}
-                                        }} else {{
-                                            if (acum < meta) {{
-                                                return {{'color': '#FF6868', 'fontWeight': 'bold'}};
-                                            }}
-                                        }}
-
-                                        return null;
-                                    }}
-                                    """
-
-                getRowId_js = JsCode("""
-                                        function(params) {
-                                            if (params.data.Setor) return params.data.Regional + params.data.Nucleo + params.data.Setor;
-                                            if (params.data.Regional === 'GERAL') return 'GERAL_ROW';
-                                            return Math.random().toString();
-                                        }
-                                    """)
-
-                data_agg_func = "avg" if pen in penalidades_media else "sum"
-                meta_agg_func = "avg" if pen in penalidades_media else "sum"
-                suppressAggFuncInHeader = True
-
-                gb = GridOptionsBuilder.from_dataframe(df_data_raw)
-                gb.configure_default_column(
-                    resizable=True, suppressSizeToFit=False, wrapHeaderText=True, autoHeaderHeight=True
-                )
-                gb.configure_column("Regional", rowGroup=True, hide=True, width=120)
-                gb.configure_column("Nucleo", rowGroup=True, hide=True, width=120)
-                gb.configure_column("Setor", rowGroup=False, hide=True, width=120)
-
-                gb.configure_column(
-                    "Meta", headerName="Meta", pinned="left", width=110, minWidth=110, suppressSizeToFit=True,
-                    aggFunc=meta_agg_func, valueFormatter=JsCode(formatter_js), type=['numericColumn', 'rightAligned']
-                )
-
-                gb.configure_column(
-                    "Acum", headerName="Acum", pinned="left", width=110, minWidth=110, suppressSizeToFit=True,
-                    aggFunc=data_agg_func, valueFormatter=JsCode(formatter_js), type=['numericColumn', 'rightAligned'],
-                    cellStyle=JsCode(cell_style_js)
-                )
-
-                cols_data_in_pivot_aggrid = [c for c in df_data_raw.columns if
-                                             c not in ["Regional", "Nucleo", "Setor", "Meta", "Acum"]]
-                for col in cols_data_in_pivot_aggrid:
-                    gb.configure_column(
-                        col, headerName=col, width=85, minWidth=80, maxWidth=100, suppressSizeToFit=False,
-                        aggFunc=data_agg_func, valueFormatter=JsCode(formatter_js),
-                        type=['numericColumn', 'rightAligned'],
-                        cellStyle=JsCode(cell_style_js)
-                    )
-
-                autoGroupColumnDef = {
-                    "headerName": "Regional / Núcleo / Setor", "pinned": "left", "width": 280,
-                    "minWidth": 250, "maxWidth": 350,
-                    "field": "Setor",  # <--- ADICIONE ESTA LINHA!
-                    "cellRendererParams": {"suppressCount": True, "suppressLeafAfterColumns": False},
-                    "wrapHeaderText": False, "autoHeaderHeight": False
-                }
-                gb.configure_grid_options(
-                    autoGroupColumnDef=autoGroupColumnDef, pinnedBottomRowData=geral_aggrid_raw.to_dict('records'),
-                    groupDefaultExpanded=0, suppressAggFuncInHeader=suppressAggFuncInHeader, rangeSelection=True,
-                    getRowId=getRowId_js, allow_unsafe_jscode=True, suppressSizeToFit=False, ensureDomOrder=True,
-                    groupSuppressGroupRows=False, groupIncludeFooter=False, groupSuppressBlankAndFloatingRow=True,
-                    suppressAggAtRoot=True, suppressColumnVirtualisation=True, rowBuffer=20,
-                    domLayout='autoHeight'  # <--- ADICIONE ESTA LINHA
+                exibir_tabela_indicador(
+                    pen, df_data_raw, geral_aggrid_raw, menor_melhor, f"grid_{pen}_{filter_hash}", medicao
                 )
-                grid_options = gb.build()
-                try:
-                    AgGrid(
-                        df_data_raw,
-                        gridOptions=grid_options,
-                        # height=400,
-                        fit_columns_on_grid_load=True,  # <--- MUDANÇA: de False para True (ajuda no trigger)
-                        enable_enterprise_modules=True,
-                        key=f"grid_{pen}_{filter_hash}",
-                        allow_unsafe_jscode=True,
-                    )
-                except Exception as e:
-                    st.error(f"Erro tabela {pen}: {e}")
-                    continue
 
 # A tag </div> final do seu arquivo
 st.markdown('</div>', unsafe_allow_html=True)
+exibir_painel_performance(medicao, painel_performance)
 
 
 
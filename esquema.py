@@ -0,0 +1,41 @@
+import pandas as pd
+
+# ===============================
+# ESQUEMA DO CONSOLIDADO
+# ===============================
+# Tipos declarados uma única vez e aplicados na ingestão
+# (preparar_dataframe_final); as etapas seguintes podem contar com eles sem
+# converter de novo. O consolidado guarda totais diários (calculos.agregar_diario),
+# não as linhas brutas; Regional/Núcleo/Setor não ficam nas linhas: CodNucleo
+# aponta para a dimensão de núcleos (nucleos.py).
+
+ESQUEMA_CONSOLIDADO = {
+    "Penalidades": "category",
+    "Chave2": "category",
+    "Tema": "category",
+    "CodNucleo": "int16",
+    "Data": "datetime64[ns]",
+    "Soma": "float64",
+    "Validos": "int32",
+    "Linhas": "int32",
+}
+
+
+def aplicar_esquema(df):
+    """
+    Converte as colunas presentes para os tipos de ESQUEMA_CONSOLIDADO:
+    dimensões categóricas, totais numéricos e Data datetime64 normalizada
+    para o dia (inválida vira NaT).
+    """
+    df = df.copy()
+    for col, tipo in ESQUEMA_CONSOLIDADO.items():
+        if col not in df.columns:
+            continue
+        if tipo == "category":
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("category")
+        elif col == "Data":
+            df[col] = pd.to_datetime(df[col], errors="coerce").dt.normalize()
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(tipo)
+    return df
@@ -0,0 +1,136 @@
+"""
+Exporta as tabelas de todos os indicadores de um período, sem Streamlit.
+
+Carrega o período pela fonte configurada (DAILY_FONTE e demais variáveis,
+como a página), calcula com o motor a tabela de cada indicador (setores +
+linha GERAL, com Meta, Acum e status) e o resumo por núcleo, e grava um
+arquivo por indicador em --saida, além de resumo e manifesto.json.
+
+Uso:
+    python exportar_tabelas.py --mes 2026-09 --saida tabelas/
+    python exportar_tabelas.py --inicio 2026-09-15 --fim 2026-10-10 --formato csv
+    python exportar_tabelas.py --janela 30 --medicao medicao.jsonl
+    python exportar_tabelas.py --mes 2026-08 --forcar
+    python -m cProfile -o perfil.out exportar_tabelas.py --mes 2026-09
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import unicodedata
+from datetime import date, timedelta
+
+import pandas as pd
+
+from cache_disco import limites_mes
+from fontes import ID_PASTA_DRIVE, fonte_configurada
+from indicadores import NOME_INDICADOR
+from ingestao import MAX_WORKERS_PADRAO
+from medicao import Medicao
+from motor import calcular_tabelas, carregar_periodo
+
+FORMATOS = ("parquet", "csv")
+
+
+def periodo_dos_argumentos(args, hoje):
+    """(inicio, fim) a partir de --mes, --inicio/--fim ou --janela (padrão: mês corrente até hoje)."""
+    if args.mes:
+        ano, mes = (int(p) for p in args.mes.split("-"))
+        inicio, fim = limites_mes(ano, mes)
+        return inicio, min(fim, hoje)
+    if args.janela:
+        return hoje - timedelta(days=args.janela - 1), hoje
+    inicio = date.fromisoformat(args.inicio) if args.inicio else hoje.replace(day=1)
+    fim = date.fromisoformat(args.fim) if args.fim else hoje
+    return inicio, fim
+
+
+def nome_arquivo(penalidade):
+    """Nome de arquivo seguro para o indicador (sem acentos, % vira "pct")."""
+    texto = unicodedata.normalize("NFKD", penalidade.replace("%", "_pct_")).encode("ascii", "ignore").decode()
+    return re.sub(r"[^0-9A-Za-z_-]+", "_", texto).strip("_")
+
+
+def gravar(df, caminho_sem_extensao, formato):
+    caminho = f"{caminho_sem_extensao}.{formato}"
+    if formato == "parquet":
+        df.to_parquet(caminho, index=False)
+    else:
+        df.to_csv(caminho, index=False)
+    return caminho
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    periodo = parser.add_mutually_exclusive_group()
+    periodo.add_argument("--mes", help="AAAA-MM (até hoje, no mês corrente)")
+    periodo.add_argument("--janela", type=int, help="últimos N dias até hoje")
+    parser.add_argument("--inicio", help="AAAA-MM-DD (padrão: início do mês corrente)")
+    parser.add_argument("--fim", help="AAAA-MM-DD (padrão: hoje)")
+    parser.add_argument("--saida", default="tabelas", help="diretório de saída (padrão: tabelas/)")
+    parser.add_argument("--formato", choices=FORMATOS, default="parquet")
+    parser.add_argument("--indicadores", nargs="+", help="só estes indicadores (padrão: todos)")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("DRIVE_MAX_WORKERS", MAX_WORKERS_PADRAO)))
+    parser.add_argument("--medicao", help="acrescenta a este arquivo os tempos de cada etapa (JSON lines)")
+    parser.add_argument("--forcar", action="store_true",
+                        help="relê da fonte também os meses fechados e regrava as partições deles")
+    args = parser.parse_args()
+    if (args.mes or args.janela) and (args.inicio or args.fim):
+        parser.error("--inicio/--fim não combinam com --mes ou --janela")
+
+    hoje = date.today()
+    inicio, fim = periodo_dos_argumentos(args, hoje)
+    medicao = Medicao(ativa=bool(args.medicao))
+
+    fonte = fonte_configurada(ID_PASTA_DRIVE)
+    problema = fonte.problema_configuracao()
+    if problema:
+        sys.exit(problema)
+    with medicao.etapa("nucleos") as registro:
+        nucleos = fonte.carregar_nucleos()
+        registro["linhas"] = len(nucleos)
+
+    df, falhas, contadores = carregar_periodo(
+        fonte, nucleos, inicio, fim, hoje=hoje, max_workers=args.workers, medicao=medicao, forcar=args.forcar
+    )
+    for falha in falhas:
+        print(f"falha: {falha['arquivo']}: {falha['erro']}", file=sys.stderr)
+    if contadores["linhas_sobrepostas"]:
+        print(f"{contadores['linhas_sobrepostas']} total(is) diário(s) repetido(s) entre arquivos descartado(s)",
+              file=sys.stderr)
+    if df.empty:
+        sys.exit(f"Nenhum dado encontrado de {inicio} a {fim}.")
+
+    tabelas, resumo = calcular_tabelas(df, nucleos, indicadores=args.indicadores, medicao=medicao)
+
+    os.makedirs(args.saida, exist_ok=True)
+    manifesto = {
+        "inicio": inicio.isoformat(), "fim": fim.isoformat(), "fonte": fonte.nome,
+        "gerado_em": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "linhas_consolidado": len(df), **contadores, "falhas": falhas, "indicadores": {},
+    }
+    with medicao.etapa("gravacao") as registro:
+        for pen, (tabela, geral) in tabelas.items():
+            # Setores e, por último, a linha GERAL; o _id só serve ao grid da página
+            df_saida = pd.concat([tabela.drop(columns=["_id"]), geral], ignore_index=True)
+            caminho = gravar(df_saida, os.path.join(args.saida, nome_arquivo(pen)), args.formato)
+            manifesto["indicadores"][pen] = {
+                "nome": NOME_INDICADOR.get(pen, pen), "arquivo": os.path.basename(caminho), "linhas": len(tabela),
+            }
+        gravar(resumo, os.path.join(args.saida, "resumo"), args.formato)
+        registro["linhas"] = len(tabelas)
+    with open(os.path.join(args.saida, "manifesto.json"), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2, default=str)
+
+    print(f"{len(tabelas)} indicador(es) de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y} gravados em {args.saida}")
+    if args.medicao:
+        medicao.encerrar()
+        medicao.exportar(args.medicao)
+        print(medicao.tabela().to_string(index=False), file=sys.stderr)
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import hashlib
+import os
+
+import pandas as pd
+
+from cliente_drive import VARIAVEL_CREDENCIAIS, cliente_processo
+from ingestao import baixar_arquivo, listar_arquivos_mes
+from nucleos import ABA_NUCLEOS_LOCAL, ARQUIVO_NUCLEOS_LOCAL, TabelaNucleos, carregar_tabela_nucleos
+
+# ===============================
+# FONTES DE DADOS
+# ===============================
+# De onde vêm os JSONs diários e a planilha de núcleos. Toda fonte expõe a
+# mesma interface, usada pela consolidação sem saber a origem:
+#   identificador             -> texto estável (chave de caches e dos totais em disco)
+#   problema_configuracao()   -> mensagem se a fonte não puder ser usada, senão None
+#   listar_mes(ano, mes)      -> [{"id", "name", "modifiedTime"}, ...]
+#   baixar(file_id)           -> bytes (chamado de várias threads)
+#   carregar_nucleos()        -> nucleos.TabelaNucleos
+
+# Pasta do Drive com os JSONs diários
+ID_PASTA_DRIVE = "1kQ0Hs1A_6JKUOXleBScT1C1ehpWM5_Vp"
+
+
+class FonteDrive:
+    """
+    Pasta do Google Drive. `cliente` (padrão: o cliente_drive.ClienteDrive do
+    processo) dá o serviço e uma conexão exclusiva por requisição.
+    """
+
+    nome = "drive"
+
+    def __init__(self, folder_id, cliente=None):
+        self.folder_id = folder_id
+        self.identificador = folder_id
+        self._cliente = cliente or cliente_processo()
+
+    def problema_configuracao(self):
+        if VARIAVEL_CREDENCIAIS not in os.environ:
+            return "Configuração de credenciais (JSON) não encontrada."
+        return None
+
+    def listar_mes(self, ano, mes):
+        with self._cliente.conexao() as http:
+            return listar_arquivos_mes(self._cliente.servico(), self.folder_id, ano, mes, http=http)
+
+    def baixar(self, file_id):
+        with self._cliente.conexao() as http:
+            return baixar_arquivo(self._cliente.servico(), file_id, http=http)
+
+    def carregar_nucleos(self):
+        return carregar_tabela_nucleos()
+
+
+class FonteDiretorio:
+    """
+    Pasta local com os JSONs diários (mesmos nomes do Drive) e a planilha de
+    núcleos em xlsx. O modifiedTime é o mtime do arquivo, então editar um
+    JSON faz ele ser relido como no Drive.
+    """
+
+    nome = "local"
+
+    def __init__(self, diretorio, arquivo_nucleos=ARQUIVO_NUCLEOS_LOCAL):
+        self.diretorio = os.path.abspath(diretorio)
+        self.arquivo_nucleos = arquivo_nucleos
+        self.identificador = f"local_{self.diretorio}"
+
+    def problema_configuracao(self):
+        if not os.path.isdir(self.diretorio):
+            return f"Diretório de dados não encontrado: {self.diretorio}"
+        return None
+
+    def listar_mes(self, ano, mes):
+        prefixo = f"{ano:04d}-{mes:02d}"
+        arquivos = []
+        with os.scandir(self.diretorio) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and prefixo in entrada.name:
+                    arquivos.append({
+                        "id": entrada.name,
+                        "name": entrada.name,
+                        "modifiedTime": str(entrada.stat().st_mtime_ns),
+                    })
+        return arquivos
+
+    def baixar(self, file_id):
+        with open(os.path.join(self.diretorio, file_id), "rb") as f:
+            return f.read()
+
+    def carregar_nucleos(self):
+        return TabelaNucleos(pd.read_excel(self.arquivo_nucleos, sheet_name=ABA_NUCLEOS_LOCAL), "local")
+
+
+class FonteMemoria:
+    """
+    Arquivos em memória ({nome: bytes}) e núcleos como DataFrame, para
+    benchmarks e testes. O modifiedTime é um hash do conteúdo.
+    """
+
+    nome = "memoria"
+
+    def __init__(self, arquivos, nucleos, identificador="memoria"):
+        self.arquivos = dict(arquivos)
+        self.nucleos = nucleos
+        self.identificador = identificador
+
+    def problema_configuracao(self):
+        return None
+
+    def listar_mes(self, ano, mes):
+        prefixo = f"{ano:04d}-{mes:02d}"
+        return [
+            {"id": nome, "name": nome, "modifiedTime": hashlib.sha1(conteudo).hexdigest()[:16]}
+            for nome, conteudo in self.arquivos.items()
+            if prefixo in nome
+        ]
+
+    def baixar(self, file_id):
+        return self.arquivos[file_id]
+
+    def carregar_nucleos(self):
+        return TabelaNucleos(self.nucleos, "memoria")
+
+
+def fonte_configurada(folder_id, cliente_drive=None):
+    """
+    Fonte escolhida por variável de ambiente: DAILY_FONTE=drive (padrão) usa
+    a pasta `folder_id` do Drive; DAILY_FONTE=local lê os JSONs de
+    DAILY_DIRETORIO_LOCAL e os núcleos de DAILY_NUCLEOS_XLSX (padrão: a
+    planilha que acompanha o repositório). `cliente_drive` substitui o
+    cliente do Drive do processo (ex.: um Drive falso nos benchmarks).
+    """
+    tipo = os.environ.get("DAILY_FONTE", "drive").strip().lower()
+    if tipo == "drive":
+        return FonteDrive(folder_id, cliente_drive)
+    if tipo == "local":
+        return FonteDiretorio(
+            os.environ.get("DAILY_DIRETORIO_LOCAL", "dados"),
+            os.environ.get("DAILY_NUCLEOS_XLSX", ARQUIVO_NUCLEOS_LOCAL),
+        )
+    raise ValueError(f"DAILY_FONTE inválida: {tipo!r} (use 'drive' ou 'local')")
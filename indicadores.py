@@ -0,0 +1,162 @@
+# ===============================
+# CONFIGURAÇÃO DOS INDICADORES
+# ===============================
+# Regras de cada indicador (formatação, sentido da meta, metas fixas e
+# dinâmicas, agregação, tema e nome de exibição), compartilhadas pela página,
+# pelo motor (motor.py) e pelos benchmarks.
+
+PERCENTUAIS_LIST = {"Meta VPML", "VPML", "Pontual%", "ControleEmbarque",
+                    "AcadDDS", "AcadFixo", "Identificacao%", "TripulacaoEscalada%", "BaixaConducao%",
+                    "MetaRecl%", "MetaAcid%", "VPML%", "Deslocamento%", "MetaTransito%", "%DesviodeEscala"}
+INTEIROS_LIST = {"DocsPendentes", "DocsVencidBloq", "Reclamacoes", "Acidentes"}
+DECIMAIS_LIST = {"NotaConducao", "EventosExcessos", "BaixaConducao", "Excessos Não Identificados"}
+MOEDA_LIST = {"MultasRegulatorias", "Multas Transito"}
+# Lista de indicadores onde "MENOR é MELHOR" (Exceder a meta é ruim/vermelho)
+LOWER_IS_BETTER_LIST = {"BaixaConducao%", "MultasRegulatorias", "DocsPendentes", "DocsVencidBloq",
+                        "Reclamacoes", "Acidentes", "VPML", "EventosExcessos", "Excessos Não Identificados", "Multas Transito", "%DesviodeEscala"}
+
+# Metas dinâmicas: indicador -> penalidade que traz a meta de cada setor
+METAS_DINAMICAS = {
+    "VPML": "Meta VPML", "Reclamacoes": "MetaReclamacoes",
+    "Acidentes": "MetaAcidentes", "MultasRegulatorias": "MetaMultasReg", "Multas Transito": "Meta_MultasTransito"
+}
+# Metas dinâmicas que são média (as demais somam os setores)
+METAS_MEDIA = {"VPML"}
+
+# Metas fixas (as dinâmicas vêm das penalidades de METAS_DINAMICAS)
+METAS_FIXAS = {
+    "Pontual%": 0.8, "ControleEmbarque": 0.95, "AcadDDS": 0.98, "AcadFixo": 0.9,
+    "BaixaConducao%": 0.1, "DocsPendentes": 0, "DocsVencidBloq": 0,
+    "EventosExcessos": 0.02, "Identificacao%": 0.98, "TripulacaoEscalada%": 0.96,
+    "NotaConducao": 70.0, "Deslocamento%": 0.90, "%DesviodeEscala": 0.15, "Excessos Não Identificados": 0.25
+}
+
+# Indicadores agregados por média (os demais somam)
+PENALIDADES_MEDIA = {
+    "Meta VPML", "VPML", "VPML%", "MetaAcid%", "MetaRecl%", "MetaReg%",
+    "Pontual%", "ControleEmbarque", "AcadDDS", "AcadFixo", "Identificacao%",
+    "TripulacaoEscalada%", "BaixaConducao%", "NotaConducao", "BaixaConducao", "EventosExcessos", "Excessos Não Identificados", "Deslocamento%", "%DesviodeEscala"
+}
+
+# Penalidades que não viram tabela (metas, bases de cálculo); as "Penal*" também ficam de fora
+PENALIDADES_OCULTAS = {
+    "Meta VPML", "MetaReclamacoes", "MetaAcidentes", "MetaMultasReg",
+    "MetaAcid%", "VPML%", "MetaReg%", "MetaRecl%", "ViagensProg",
+    "MotsAtivos", "KmRodado", "Vendas", "BaixaConducao", "MetaTransito%", "Meta_MultasTransito"
+}
+
+# Nome de exibição de cada indicador
+NOME_INDICADOR = {
+    "DocsVencidBloq": "Documento Vencidos/Bloqueados",
+    "DocsPendentes": "Documento Pendentes",
+    "ControleEmbarque": "Controle de Embarque",
+    "VPML": "Veículo Parado com o Motor Ligado",
+    "NotaConducao": "Nota Condução",
+    "BaixaConducao%": "% Baixa Condução",
+    "AcadDDS": "DDS",
+    "AcadFixo": "Cursos Fixos",
+    "EventosExcessos": "Excessos de Velocidade",
+    "Pontual%": "Pontualidade",
+    "MultasRegulatorias": "Multas Regulatórias",
+    "TripulacaoEscalada%": "Escala de Tripulantes - OPTZ",
+    "Identificacao%": "Identificação de Condutor",
+    "Reclamacoes": "Reclamações",
+    "Acidentes": "Sinistros",
+    "PendIdentificacao": "Pendência de Identificacao",
+    "Multas Transito": "Multas de Trânsito",
+    "Excessos Não Identificados": "Excessos Não Identificados",
+    "Deslocamento%": "Deslocamento Identificado",
+    "%DesviodeEscala": "Desvio de Escala Programada",
+}
+
+# Tema de cada penalidade (agrupamento na página e filtro de Tema)
+INDICADOR_TEMA_MAP = {
+    "DocsVencidBloq": "Documentação",
+    "DocsPendentes": "Documentação",
+    "PenalDocsVencidBloq": "Documentação",
+    "PenalDocsPendentes": "Documentação",
+    "PenalDocs": "Documentação",
+    "ControleEmbarque": "Controle de Embarque",
+    "PenalControleEmbarque": "Controle de Embarque",
+    "VPML": "Veículo Parado com o Motor Ligado",
+    "PenalVPML": "Veículo Parado com o Motor Ligado",
+    "Meta VPML": "Veículo Parado com o Motor Ligado",
+    "VPML%": "Veículo Parado com o Motor Ligado",
+    "NotaConducao": "Histórico de Condução",
+    "PenalConducao": "Histórico de Condução",
+    "PenalNotaConducao": "Histórico de Condução",
+    "PenalBaixaConducao": "Histórico de Condução",
+    "BaixaConducao": "Histórico de Condução",
+    "BaixaConducao%": "Histórico de Condução",
+    "PenalAcadDDS": "Treinamentos EAD",
+    "AcadDDS": "Treinamentos EAD",
+    "PenalAcadFixo": "Treinamentos EAD",
+    "AcadFixo": "Treinamentos EAD",
+    "PenalAcademia": "Treinamentos EAD",
+    "EventosExcessos": "Excessos de Velocidade",
+    "PenalExcessos": "Excessos de Velocidade",
+    "PenalPontualidade": "Pontualidade",
+    "Pontual%": "Pontualidade",
+    "MetaReg%": "Multas Regulatórias",
+    "MultasRegulatorias": "Multas Regulatórias",
+    "MetaMultasReg": "Multas Regulatórias",
+    "PenalMultasReg": "Multas Regulatórias",
+    "PenalTripulacao": "Escala de Tripulantes - OPTZ",
+    "TripulacaoEscalada%": "Escala de Tripulantes - OPTZ",
+    "PenalIdentificacao": "Identificação de Condutor",
+    "PenalIdentCondutor": "Identificação de Condutor",
+    "Identificacao%": "Identificação de Condutor",
+    "PendIdentificacao": "Identificação de Condutor",
+    "Reclamacoes": "Reclamações",
+    "MetaReclamacoes": "Reclamações",
+    "MetaRecl%": "Reclamações",
+    "PenalReclamacoes": "Reclamações",
+    "Acidentes": "Sinistros",
+    "PenalAcidentes": "Sinistros",
+    "MetaAcidentes": "Sinistros",
+    "MetaAcid%": "Sinistros",
+    "MotsAtivos": "Geral",
+    "KmRodado": "Geral",
+    "ViagensProg": "Geral",
+    "Vendas": "Geral",
+    "Multas Transito": "Multas de Trânsito",
+    "PenalMultastransito": "Multas de Trânsito",
+    "MetaTransito%": "Multas de Trânsito",
+    "Meta_MultasTransito": "Multas de Trânsito",
+    "Excessos Não Identificados": "Excessos de Velocidade",
+    "PenalExcessosNãoIdentificados": "Excessos de Velocidade",
+    "Deslocamento%": "Identificação de Condutor",
+    "PenalDeslocamento": "Identificação de Condutor",
+    "%DesviodeEscala": "Escala de Tripulantes - OPTZ",
+    "PenalDesviodeEscala": "Escala de Tripulantes - OPTZ",
+}
+
+# Ícone de cada tema (cabeçalho dos grupos na página)
+TEMA_ICONE_MAP = {
+    "Documentação": "📄",
+    "Controle de Embarque": "🚦",
+    "Veículo Parado com o Motor Ligado": "⛽",
+    "Histórico de Condução": "🚌",
+    "Treinamentos EAD": "🎓",
+    "Excessos de Velocidade": "🚨",
+    "Pontualidade": "⏱️",
+    "Multas Regulatórias": "⚠️💵",
+    "Multas de Trânsito": "🚦🧾🚗",
+    "Escala de Tripulantes - OPTZ": "👥",
+    "Identificação de Condutor": "👤",
+    "Reclamações": "🗣️",
+    "Sinistros": "💥",
+    "Geral": "⚙️",
+    "Outros": "❓",
+}
+
+
+def eh_exibivel(penalidade):
+    """Se a penalidade vira tabela (não é "Penal*" nem está em PENALIDADES_OCULTAS)."""
+    return not penalidade.startswith("Penal") and penalidade not in PENALIDADES_OCULTAS
+
+
+def ordem_indicadores():
+    """Indicadores exibíveis do INDICADOR_TEMA_MAP em ordem estável (pelo nome de exibição)."""
+    candidatos = [p for p in INDICADOR_TEMA_MAP if eh_exibivel(p)]
+    return sorted(candidatos, key=lambda p: NOME_INDICADOR.get(p, p))
@@ -0,0 +1,684 @@
+import functools
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calculos import CHAVE_DIARIA
+from medicao import MEDICAO_INATIVA
+
+# ===============================
+# INGESTÃO DOS JSONS DIÁRIOS
+# ===============================
+# Funções puras (sem chamadas st.*) para poderem ser importadas pelo
+# dashboard e pelos scripts de benchmark.
+
+MAX_WORKERS_PADRAO = 8
+PADRAO_DATA_ARQUIVO = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+def limpar_nome_coluna(coluna):
+    """Remove colchetes dos nomes das colunas: [Data] -> Data"""
+    match = re.search(r'\[(.*?)\]', str(coluna))
+    return match.group(1) if match else str(coluna)
+
+
+def encontrar_tables(obj):
+    """Busca recursiva pela chave 'tables' no JSON (igual ao JS)"""
+    if isinstance(obj, dict):
+        if 'tables' in obj and isinstance(obj['tables'], list):
+            return obj['tables']
+        for key, value in obj.items():
+            resultado = encontrar_tables(value)
+            if resultado: return resultado
+    elif isinstance(obj, list):
+        for item in obj:
+            resultado = encontrar_tables(item)
+            if resultado: return resultado
+    return None
+
+
+def extrair_data_arquivo(nome):
+    """Data embutida no nome do arquivo (AAAA-MM-DD) ou None."""
+    match_data = PADRAO_DATA_ARQUIVO.search(nome)
+    if not match_data:
+        return None
+    return pd.to_datetime(match_data.group(0))
+
+
+# ===============================
+# DATAS
+# ===============================
+# Datas ISO (2026-03-05, 2026-03-05T00:00:00, ...) são convertidas antes de
+# tudo, como texto original. As demais são tentadas nos formatos abaixo, em
+# ordem de preferência (depois de trocar "-" por "/" e completar a hora). O
+# que não casar com nenhum cai no parse dayfirst do pandas, valor a valor.
+FORMATOS_DATA = ("%d/%m/%Y %H:%M:%S", "%Y/%m/%d %H:%M:%S", "%d/%m/%Y", "%Y/%m/%d")
+# Fuso colado na hora ("...T23:30:00-03:00", "...00:00:00.000Z"); o grupo é a hora
+SUFIXO_FUSO = re.compile(r"(\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)(?:Z|[+-]\d{2}:?\d{2})$")
+
+
+def converter_datas(valores):
+    """
+    Converte uma coluna de datas em texto (ou mista) para datetime64.
+
+    Vetorizado: cada valor distinto é convertido uma vez; primeiro os ISO
+    (ano na frente, com ou sem "T" e hora), depois cada formato de
+    FORMATOS_DATA de uma vez sobre todos os que ainda faltam. Só o
+    que sobrar vai para o parse dayfirst, um valor por vez. Vazio ou
+    inválido vira NaT.
+
+    Retorna (datas, lentas): Series alinhada a `valores` e o número de
+    linhas que precisaram do parse valor a valor.
+    """
+    serie = pd.Series(valores)
+    if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        return serie, 0
+
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    # Fuso no fim da hora ("Z", "-03:00") é descartado sem converter: vale o
+    # horário local da operação, como nas datas sem fuso.
+    originais = (
+        pd.Series(unicos, dtype=object).map(str).str.strip()
+        .str.replace(SUFIXO_FUSO, r"\1", regex=True)
+    )
+    validos = originais.ne("").to_numpy()
+    # ISO antes da troca de "-" por "/": "2026-03-05T00:00:00" não casa com
+    # nenhum formato depois dela e o dayfirst leria 3 de maio.
+    convertidas = pd.to_datetime(originais, format="ISO8601", errors="coerce").astype("datetime64[ns]")
+
+    textos = originais.str.replace("-", "/", regex=False)
+    textos = textos.where(textos.str.contains(":", regex=False), textos + " 00:00:00")
+    for formato in FORMATOS_DATA:
+        faltam = validos & convertidas.isna().to_numpy()
+        if not faltam.any():
+            break
+        convertidas[faltam] = pd.to_datetime(textos[faltam], format=formato, errors="coerce")
+
+    lentos = validos & convertidas.isna().to_numpy()
+    if lentos.any():
+        convertidas[lentos] = [pd.to_datetime(t, dayfirst=True, errors="coerce") for t in textos[lentos]]
+
+    # Código -1 (valor nulo) aponta para o NaT acrescentado no fim
+    datas = np.append(convertidas.to_numpy(), np.datetime64("NaT", "ns"))[codigos]
+    lentas = int(np.isin(codigos, np.flatnonzero(lentos)).sum())
+    return pd.Series(datas, index=serie.index, name=serie.name), lentas
+
+
+def selecionar_arquivos_periodo(files, data_inicio, data_fim):
+    """
+    Filtra a listagem do Drive para os JSONs dentro do período e devolve
+    [(data_arquivo, arquivo), ...] ordenado por data (e nome, para empates).
+    """
+    t_inicio = pd.to_datetime(data_inicio)
+    t_fim = pd.to_datetime(data_fim)
+
+    selecionados = []
+    for f in files:
+        if not f["name"].endswith(".json"): continue
+        dt_arquivo = extrair_data_arquivo(f["name"])
+        if dt_arquivo is None: continue
+        if t_inicio <= dt_arquivo <= t_fim:
+            selecionados.append((dt_arquivo, f))
+
+    selecionados.sort(key=lambda item: (item[0], item[1]["name"]))
+    return selecionados
+
+
+def montar_query_mes(folder_id, ano, mes, filtrar_nome=True):
+    """
+    Query da listagem de um mês: arquivos da pasta cujo nome contém "AAAA-MM".
+    Com filtrar_nome=False devolve só o filtro de pasta (usado como fallback).
+    """
+    query = f"'{folder_id}' in parents and trashed = false"
+    if filtrar_nome:
+        query += f" and name contains '{ano:04d}-{mes:02d}'"
+    return query
+
+
+def listar_arquivos_drive(service, query, page_size=1000, http=None):
+    """
+    Lista todos os arquivos da query, seguindo o nextPageToken até a última
+    página. `http` é a conexão usada (padrão: a do próprio serviço).
+    """
+    files = []
+    page_token = None
+    while True:
+        results = service.files().list(
+            q=query,
+            fields="nextPageToken, files(id, name, mimeType, modifiedTime)",
+            orderBy="modifiedTime desc",
+            pageSize=page_size,
+            pageToken=page_token,
+        ).execute(http=http)
+        files.extend(results.get("files", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return files
+
+
+def listar_arquivos_mes(service, folder_id, ano, mes, http=None):
+    """
+    Arquivos de um mês. O filtro por nome vai para a query do Drive; como o
+    operador `contains` do Drive casa apenas prefixos de termos, se a busca
+    filtrada não trouxer nada a pasta é listada inteira (o filtro por data em
+    `selecionar_arquivos_periodo` continua valendo).
+    """
+    files = listar_arquivos_drive(service, montar_query_mes(folder_id, ano, mes), http=http)
+    if not files:
+        files = listar_arquivos_drive(service, montar_query_mes(folder_id, ano, mes, filtrar_nome=False), http=http)
+    prefixo = f"{ano:04d}-{mes:02d}"
+    return [f for f in files if prefixo in f["name"]]
+
+
+def meses_do_periodo(data_inicio, data_fim):
+    """[(ano, mes), ...] de todos os meses tocados pelo período."""
+    return [(p.year, p.month) for p in pd.period_range(data_inicio, data_fim, freq="M")]
+
+
+def baixar_arquivo(service, file_id, http=None):
+    """Baixa o conteúdo bruto de um arquivo do Drive (pela conexão `http`, se dada)."""
+    from googleapiclient.http import MediaIoBaseDownload
+
+    request = service.files().get_media(fileId=file_id)
+    if http is not None:
+        request.http = http
+    fh = io.BytesIO()
+    downloader = MediaIoBaseDownload(fh, request)
+    done = False
+    while not done:
+        _, done = downloader.next_chunk()
+    return fh.getvalue()
+
+
+# ===============================
+# PARSER INCREMENTAL DE tables[*].rows
+# ===============================
+# Em vez de json.loads do documento inteiro + busca recursiva, localiza o
+# array "tables" no texto e decodifica só ele. Para exports grandes (acima
+# de LIMITE_STREAMING_BYTES) as linhas são decodificadas uma a uma e só os
+# valores (tuplas) ficam guardados, agrupados pelo esquema de chaves da
+# linha: nenhuma árvore de dicts do documento fica em memória, ao custo de
+# mais CPU por linha. A limpeza dos nomes de coluna é feita uma única vez
+# por esquema.
+
+LIMITE_STREAMING_BYTES = int(os.environ.get("DAILY_LIMITE_STREAMING_MB", 16)) * 1024 * 1024
+
+_DECODER = json.JSONDecoder()
+_ESPACOS = re.compile(r'[ \t\n\r]*')
+_INICIO_TABLES = re.compile(r'"tables"\s*:\s*\[')
+
+
+@functools.lru_cache(maxsize=256)
+def _nomes_limpos(colunas):
+    return [limpar_nome_coluna(c) for c in colunas]
+
+
+LINHAS_POR_LOTE = 50_000
+
+
+def _compartilhar_textos(df):
+    """Colunas de texto passam a apontar para um único objeto str por valor distinto."""
+    for col in df.columns:
+        if df[col].dtype == object:
+            codigos, unicos = pd.factorize(df[col], use_na_sentinel=True)
+            if len(unicos) < len(df) // 2:
+                valores = np.asarray(unicos, dtype=object).take(codigos)
+                valores[codigos == -1] = None
+                df[col] = valores
+    return df
+
+
+class _ColetorLinhas:
+    """
+    Acumula as linhas de uma tabela como tuplas, agrupadas pelo esquema (tupla
+    de chaves). `trechos` guarda onde cada sequência de um mesmo esquema
+    começa, para restaurar a ordem original quando há mais de um esquema.
+    A cada LINHAS_POR_LOTE linhas as tuplas viram um DataFrame compacto.
+    """
+
+    def __init__(self):
+        self.lotes = []
+        self.linhas = 0
+        self._novo_lote()
+
+    def _novo_lote(self):
+        self.grupos = {}
+        self.trechos = []  # [(esquema, índice da primeira linha do trecho no lote)]
+        self.total = 0
+
+    def fechar_lote(self):
+        if not self.total:
+            return
+        partes = [
+            pd.DataFrame.from_records(valores, columns=list(chaves))
+            for chaves, valores in self.grupos.items()
+        ]
+        if len(partes) == 1:
+            df = partes[0]
+        else:
+            # Esquemas diferentes (chaves nulas omitidas): junta e restaura a ordem original
+            limites = [inicio for _, inicio in self.trechos[1:]] + [self.total]
+            posicoes = {chaves: [] for chaves in self.grupos}
+            for (chaves, inicio), fim in zip(self.trechos, limites):
+                posicoes[chaves].append(np.arange(inicio, fim))
+            ordem = np.concatenate([np.concatenate(posicoes[chaves]) for chaves in self.grupos])
+            df = pd.concat(partes, ignore_index=True).iloc[np.argsort(ordem, kind="stable")]
+            df = df.reset_index(drop=True)
+        self.lotes.append(_compartilhar_textos(df))
+        self.linhas += self.total
+        self._novo_lote()
+
+    def dataframe(self):
+        self.fechar_lote()
+        if not self.lotes:
+            return pd.DataFrame()
+        df = self.lotes[0] if len(self.lotes) == 1 else pd.concat(self.lotes, ignore_index=True)
+        df.columns = _nomes_limpos(tuple(df.columns))
+        return df
+
+
+def _pular_espacos(texto, pos):
+    return _ESPACOS.match(texto, pos).end()
+
+
+def _ler_rows(texto, pos, coletor):
+    """Lê o array de linhas que começa em texto[pos] == '['; devolve a posição após o ']'."""
+    pos = _pular_espacos(texto, pos + 1)
+    if texto[pos] == "]":
+        return pos + 1
+
+    # Laço quente: uma iteração por linha, com referências locais
+    scan_once = _DECODER.scan_once
+    espacos = _ESPACOS.match
+    esquema_atual = None
+    adicionar = None
+    n = coletor.total
+    try:
+        while True:
+            row, pos = scan_once(texto, pos)
+            chaves = tuple(row)
+            if chaves != esquema_atual:
+                if not isinstance(row, dict):
+                    raise ValueError("linha de tabela não é um objeto JSON")
+                esquema_atual = chaves
+                adicionar = coletor.grupos.setdefault(chaves, []).append
+                coletor.trechos.append((chaves, n))
+            adicionar(tuple(row.values()))
+            n += 1
+            if n >= LINHAS_POR_LOTE:
+                coletor.total = n
+                coletor.fechar_lote()
+                n = 0
+                esquema_atual = None
+
+            c = texto[pos]
+            if c == ",":
+                pos += 1
+                if texto[pos] != "{":
+                    pos = espacos(texto, pos).end()
+                continue
+            if c in " \t\n\r":
+                pos = espacos(texto, pos).end()
+                c = texto[pos]
+                if c == ",":
+                    pos = espacos(texto, pos + 1).end()
+                    continue
+            if c == "]":
+                return pos + 1
+            else:
+                raise ValueError(f"JSON inválido na posição {pos}")
+    except StopIteration as e:
+        raise ValueError(f"JSON inválido na posição {e.value}") from None
+    finally:
+        coletor.total = n
+
+
+def _ler_tabela(texto, pos):
+    """Lê um objeto de tabela em texto[pos] == '{'; devolve (coletor ou None, posição após o '}')."""
+    coletor = None
+    pos = _pular_espacos(texto, pos + 1)
+    if texto[pos] == "}":
+        return None, pos + 1
+    while True:
+        chave, pos = _DECODER.raw_decode(texto, pos)
+        pos = _pular_espacos(texto, pos)
+        if texto[pos] != ":":
+            raise ValueError(f"JSON inválido na posição {pos}")
+        pos = _pular_espacos(texto, pos + 1)
+        if chave == "rows" and texto[pos] == "[":
+            coletor = _ColetorLinhas()
+            pos = _ler_rows(texto, pos, coletor)
+        else:
+            _, pos = _DECODER.raw_decode(texto, pos)
+        pos = _pular_espacos(texto, pos)
+        if texto[pos] == ",":
+            pos = _pular_espacos(texto, pos + 1)
+        elif texto[pos] == "}":
+            return coletor, pos + 1
+        else:
+            raise ValueError(f"JSON inválido na posição {pos}")
+
+
+def _ler_tables(texto, pos):
+    """Lê o array "tables" em texto[pos] == '[' linha a linha; devolve um DataFrame por tabela com linhas."""
+    dfs = []
+    pos = _pular_espacos(texto, pos + 1)
+    if texto[pos] == "]":
+        return dfs
+    while True:
+        if texto[pos] == "{":
+            coletor, pos = _ler_tabela(texto, pos)
+            if coletor is not None:
+                df = coletor.dataframe()
+                if len(df):
+                    dfs.append(df)
+        else:
+            _, pos = _DECODER.raw_decode(texto, pos)
+        pos = _pular_espacos(texto, pos)
+        if texto[pos] == ",":
+            pos = _pular_espacos(texto, pos + 1)
+        elif texto[pos] == "]":
+            return dfs
+        else:
+            raise ValueError(f"JSON inválido na posição {pos}")
+
+
+def _tables_para_dataframes(tables):
+    dfs = []
+    for table in tables:
+        if isinstance(table, dict) and "rows" in table and table["rows"]:
+            df_temp = _compartilhar_textos(pd.DataFrame(table["rows"]))
+            # Limpa nomes de colunas: [Data] -> Data
+            df_temp.columns = _nomes_limpos(tuple(df_temp.columns))
+            dfs.append(df_temp)
+    return dfs
+
+
+def extrair_tabelas_json(conteudo, streaming=None):
+    """
+    DataFrames das tabelas (`tables[*].rows`) de um export, com nomes de coluna já limpos.
+
+    Decodifica apenas o array "tables" (linha a linha se `streaming`, que por
+    padrão vale para conteúdos acima de LIMITE_STREAMING_BYTES). Se o
+    documento não tiver o formato esperado, recorre ao json.loads completo +
+    `encontrar_tables`.
+    """
+    if streaming is None:
+        streaming = len(conteudo) >= LIMITE_STREAMING_BYTES
+    texto = conteudo.decode("utf-8-sig") if isinstance(conteudo, bytes) else conteudo
+    try:
+        for match in _INICIO_TABLES.finditer(texto):
+            inicio = match.end() - 1
+            if streaming:
+                dfs = _ler_tables(texto, inicio)
+            else:
+                dfs = _tables_para_dataframes(_DECODER.raw_decode(texto, inicio)[0])
+            if dfs:
+                return dfs
+    except (ValueError, IndexError):
+        pass
+
+    return _tables_para_dataframes(encontrar_tables(json.loads(texto)) or [])
+
+
+class Projecao:
+    """
+    O que a carga precisa de cada tabela: as `colunas` (None = todas) e as
+    linhas cujas Penalidades não estão em `descartar` nem começam com algum
+    de `descartar_prefixos`. Aplicada tabela a tabela logo após o parse, antes
+    da conversão de datas, da concatenação e dos totais diários.
+
+    `chave` identifica a projeção nos caches em disco ("" para a completa),
+    já que um frame projetado não serve a uma carga que precise de mais.
+    """
+
+    def __init__(self, colunas=None, descartar=(), descartar_prefixos=()):
+        self.colunas = None if colunas is None else tuple(sorted(set(colunas)))
+        self.descartar = frozenset(descartar)
+        self.descartar_prefixos = tuple(sorted(descartar_prefixos))
+        if self.colunas is None and not self.descartar and not self.descartar_prefixos:
+            self.chave = ""
+        else:
+            declaracao = repr((self.colunas, sorted(self.descartar), self.descartar_prefixos))
+            self.chave = hashlib.sha1(declaracao.encode("utf-8")).hexdigest()[:12]
+
+    def descarta(self, penalidade):
+        return isinstance(penalidade, str) and (
+            penalidade in self.descartar or penalidade.startswith(self.descartar_prefixos)
+        )
+
+    def aplicar(self, df):
+        """Linhas e colunas necessárias de uma tabela (o próprio df se nada sai)."""
+        linhas = None
+        if (self.descartar or self.descartar_prefixos) and "Penalidades" in df.columns:
+            # Poucas penalidades distintas por tabela: testa os valores únicos, não as linhas
+            fora = [p for p in pd.unique(df["Penalidades"]) if self.descarta(p)]
+            if fora:
+                linhas = ~df["Penalidades"].isin(fora).to_numpy()
+        colunas = None
+        if self.colunas is not None:
+            colunas = [c for c in df.columns if c in self.colunas]
+            if len(colunas) == len(df.columns):
+                colunas = None
+        if linhas is None and colunas is None:
+            return df
+        return df.loc[
+            slice(None) if linhas is None else linhas,
+            df.columns if colunas is None else colunas,
+        ].reset_index(drop=True)
+
+
+PROJECAO_COMPLETA = Projecao()
+
+
+def parsear_json_diario(conteudo, dt_arquivo, projecao=PROJECAO_COMPLETA):
+    """
+    Converte o JSON de um dia em uma lista de DataFrames (um por tabela),
+    com Data já em datetime64 e só o que a `projecao` pede (tabelas que
+    ficam vazias saem da lista). Quando a tabela traz a própria Data, o
+    número de linhas que precisaram do parse lento fica em
+    `df.attrs["datas_lentas"]`.
+    """
+    dfs = []
+    for df_temp in extrair_tabelas_json(conteudo):
+        df_temp = projecao.aplicar(df_temp)
+        if df_temp.empty:
+            continue
+        # Se não tiver coluna data dentro, injeta a data do nome do arquivo
+        if "Data" not in df_temp.columns:
+            df_temp["Data"] = dt_arquivo
+        else:
+            df_temp["Data"], df_temp.attrs["datas_lentas"] = converter_datas(df_temp["Data"])
+        dfs.append(df_temp)
+    return dfs
+
+
+def baixar_arquivos_por_id(fonte, arquivos, max_workers=MAX_WORKERS_PADRAO, cache=None, medicao=None,
+                           projecao=PROJECAO_COMPLETA):
+    """
+    Baixa e parseia os arquivos em paralelo com no máximo `max_workers` threads.
+
+    `fonte` é uma fonte de dados (ver fontes.py) cujo `baixar(file_id)` pode
+    ser chamado de várias threads. `arquivos` é a saída de
+    `selecionar_arquivos_periodo`.
+
+    Com `cache` (um `cache_disco.CacheArquivos`), arquivos cujo
+    (id, modifiedTime) já está em disco são lidos localmente e só os novos ou
+    modificados são baixados. Cada tabela é recortada pela `projecao`
+    (`Projecao`) no parse; a chave dela entra no cache de arquivos.
+
+    Retorna (frames, falhas): {file_id: DataFrame} e uma lista de dicts
+    {"arquivo", "id", "erro"} — um por arquivo que não pôde ser carregado.
+    Frames recém-parseados trazem em `attrs["datas_lentas"]` quantas linhas
+    tiveram a Data convertida pelo caminho lento (ver `converter_datas`).
+
+    Com `medicao` (medicao.Medicao), cada leitura do cache, download, parse e
+    gravação no cache é registrada com o nome do arquivo, bytes e linhas.
+    """
+    medicao = medicao or MEDICAO_INATIVA
+
+    def _processar(item):
+        dt_arquivo, f = item
+        modificado = f.get("modifiedTime")
+        if cache is not None:
+            with medicao.etapa("cache_leitura", arquivo=f["name"]) as registro:
+                df_cache = cache.ler(f["id"], modificado, projecao.chave)
+                registro["linhas"] = 0 if df_cache is None else len(df_cache)
+            if df_cache is not None:
+                return df_cache
+
+        with medicao.etapa("download", arquivo=f["name"]) as registro:
+            conteudo = fonte.baixar(f["id"])
+            registro["bytes"] = len(conteudo)
+        with medicao.etapa("parse", arquivo=f["name"]) as registro:
+            tabelas = parsear_json_diario(conteudo, dt_arquivo, projecao)
+            df_arquivo = pd.concat(tabelas, ignore_index=True) if tabelas else pd.DataFrame()
+            registro["linhas"] = len(df_arquivo)
+        # A contagem vale só para este parse; não vai para o cache (o Parquet guardaria os attrs)
+        df_arquivo.attrs.clear()
+
+        if cache is not None:
+            with medicao.etapa("cache_gravacao", arquivo=f["name"]) as registro:
+                cache.gravar(f["id"], modificado, df_arquivo, projecao.chave)
+                registro["linhas"] = len(df_arquivo)
+        df_arquivo.attrs["datas_lentas"] = sum(t.attrs.get("datas_lentas", 0) for t in tabelas)
+        return df_arquivo
+
+    if not arquivos:
+        return {}, []
+
+    workers = max(1, min(int(max_workers), len(arquivos)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="download") as pool:
+        futuros = [pool.submit(_processar, item) for item in arquivos]
+
+    frames = {}
+    falhas = []
+    for (dt_arquivo, f), futuro in zip(arquivos, futuros):
+        try:
+            frames[f["id"]] = futuro.result()
+        except Exception as e:
+            falhas.append({"arquivo": f["name"], "id": f["id"], "erro": str(e)})
+    return frames, falhas
+
+
+def baixar_arquivos_concorrente(fonte, arquivos, max_workers=MAX_WORKERS_PADRAO, cache=None, medicao=None,
+                                projecao=PROJECAO_COMPLETA):
+    """
+    Como `baixar_arquivos_por_id`, mas devolve (dfs, falhas) com um DataFrame
+    por arquivo na ordem de `arquivos` (por data), independente da ordem em
+    que os downloads terminam.
+    """
+    frames, falhas = baixar_arquivos_por_id(
+        fonte, arquivos, max_workers=max_workers, cache=cache, medicao=medicao, projecao=projecao
+    )
+    dfs = [frames[f["id"]] for _, f in arquivos if f["id"] in frames and not frames[f["id"]].empty]
+    return dfs, falhas
+
+
+# ===============================
+# CONSOLIDADO INCREMENTAL
+# ===============================
+
+def concatenar_sem_sobreposicao(dfs):
+    """
+    Concatena `dfs` (um por arquivo, em ordem crescente de precedência)
+    mantendo cada fato (Penalidades, Chave2, Data) só do último arquivo em
+    que aparece: um dia reexportado, ou um export que traz mais que o próprio
+    dia, substitui a versão anterior em vez de somar com ela. Linhas de um
+    mesmo arquivo nunca se descartam. Retorna (df, linhas_descartadas).
+    """
+    dfs = [df for df in dfs if not df.empty]
+    if not dfs:
+        return pd.DataFrame(), 0
+    df = pd.concat(dfs, ignore_index=True) if len(dfs) > 1 else dfs[0]
+    if len(dfs) == 1 or any(col not in df.columns for col in CHAVE_DIARIA):
+        return df, 0
+    repetidas = df.duplicated(CHAVE_DIARIA).to_numpy()
+    if not repetidas.any():
+        # Caso comum (cada arquivo só com o próprio dia): um hash das chaves e nada mais
+        return df, 0
+    arquivo = np.repeat(np.arange(len(dfs), dtype=np.int32), [len(d) for d in dfs])
+    ultimo = pd.Series(arquivo).groupby(
+        [df[col].to_numpy() for col in CHAVE_DIARIA], dropna=False, sort=False
+    ).transform("max").to_numpy()
+    manter = arquivo == ultimo
+    descartadas = int(len(df) - manter.sum())
+    if descartadas:
+        df = df[manter].reset_index(drop=True)
+    return df, descartadas
+
+
+class ConsolidadoIncremental:
+    """
+    Frame bruto de um período mantido arquivo a arquivo.
+
+    A cada `atualizar` só os arquivos novos ou com modifiedTime diferente são
+    carregados; as linhas deles substituem as da versão anterior e arquivos
+    que sumiram da listagem são descartados. Fatos repetidos entre arquivos
+    ficam só do mais recente (data do arquivo, depois modifiedTime; ver
+    concatenar_sem_sobreposicao), e `linhas_sobrepostas` conta os
+    descartados. Seguro para uso entre sessões (as operações são protegidas
+    por lock).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._arquivos = {}  # file_id -> (data_arquivo, nome, modifiedTime, DataFrame)
+        self._frame = None
+        self.linhas_sobrepostas = 0
+
+    @property
+    def versao(self):
+        """Identificador do conteúdo atual; muda quando um arquivo entra, sai ou é modificado."""
+        with self._lock:
+            chaves = sorted((fid, info[2] or "") for fid, info in self._arquivos.items())
+        return hashlib.sha1(repr(chaves).encode("utf-8")).hexdigest()[:16]
+
+    def atualizar(self, arquivos, carregar):
+        """
+        Sincroniza com a listagem `arquivos` (saída de `selecionar_arquivos_periodo`).
+
+        `carregar(pendentes)` deve devolver ({file_id: DataFrame}, falhas), como
+        `baixar_arquivos_por_id`. Arquivos que falharem mantêm a versão
+        anterior e são tentados de novo na próxima sincronização.
+        """
+        with self._lock:
+            ids_listados = {f["id"] for _, f in arquivos}
+            removidos = [fid for fid in self._arquivos if fid not in ids_listados]
+            novos = [(dt, f) for dt, f in arquivos if f["id"] not in self._arquivos]
+            modificados = [
+                (dt, f) for dt, f in arquivos
+                if f["id"] in self._arquivos and self._arquivos[f["id"]][2] != f.get("modifiedTime")
+            ]
+            pendentes = novos + modificados
+
+            frames, falhas = carregar(pendentes) if pendentes else ({}, [])
+
+            for fid in removidos:
+                del self._arquivos[fid]
+            for dt, f in pendentes:
+                if f["id"] in frames:
+                    self._arquivos[f["id"]] = (dt, f["name"], f.get("modifiedTime"), frames[f["id"]])
+
+            if removidos or frames:
+                self._frame = None
+
+        return {
+            "novos": len(novos), "modificados": len(modificados),
+            "removidos": len(removidos), "falhas": falhas,
+        }
+
+    def frame(self):
+        """Concatenação de todos os arquivos, em ordem de data, sem fatos repetidos entre eles."""
+        with self._lock:
+            if self._frame is None:
+                itens = sorted(self._arquivos.values(), key=lambda i: (i[0], i[2] or "", i[1]))
+                self._frame, self.linhas_sobrepostas = concatenar_sem_sobreposicao([i[3] for i in itens])
+            return self._frame
@@ -0,0 +1,145 @@
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# ===============================
+# MEDIÇÃO DE DESEMPENHO
+# ===============================
+# Tempo, linhas e bytes de cada etapa de uma execução da página (listagem,
+# download e parse de cada arquivo, consolidação, cubo, pivot de cada
+# indicador, montagem do grid...). Uma Medicao por execução; pode ser usada
+# de várias threads ao mesmo tempo (os downloads paralelos registram nela).
+
+# Atributo que identifica o item medido, na ordem em que é procurado
+ATRIBUTOS_ITEM = ("arquivo", "indicador", "mes")
+
+
+class Medicao:
+    """
+    Registros de uma execução. Inativa (`ativa=False`), não guarda nada e
+    custa só a chamada, para poder ficar sempre no código. `origem` liga a
+    medição à execução de onde ela saiu (ver `derivada`).
+    """
+
+    def __init__(self, ativa=True, origem=None):
+        self.ativa = ativa
+        self.origem = origem
+        self.encerrada = False
+        self.execucao = uuid.uuid4().hex[:8]
+        self.inicio = time.time()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._registros = []
+        self._exportados = 0
+
+    @contextmanager
+    def etapa(self, nome, **atributos):
+        """
+        Mede o bloco `with`. O dict devolvido é o próprio registro: aceita
+        atributos conhecidos só dentro do bloco (ex.: registro["linhas"] =
+        len(df)) ou depois dele, quando já traz "segundos".
+        """
+        registro = self._novo_registro(nome, atributos)
+        if not self.ativa:
+            yield registro
+            return
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            self._guardar(registro, inicio, time.perf_counter() - inicio)
+
+    def registrar(self, nome, segundos, **atributos):
+        """Registra uma etapa já medida (`segundos`) com seus atributos."""
+        if not self.ativa:
+            return
+        self._guardar(self._novo_registro(nome, atributos), time.perf_counter() - segundos, segundos)
+
+    def encerrar(self):
+        """Registra o tempo total ("execucao") e marca a medição como encerrada."""
+        self.registrar("execucao", self.decorrido())
+        self.encerrada = True
+
+    def derivada(self):
+        """
+        Medição nova, com a mesma `ativa`, para trabalho feito depois que esta
+        foi encerrada (ex.: reexecução só de um fragmento da página).
+        """
+        return Medicao(ativa=self.ativa, origem=self.execucao)
+
+    def _novo_registro(self, nome, atributos):
+        registro = {"execucao": self.execucao, "etapa": nome, **atributos}
+        if self.origem:
+            registro["origem"] = self.origem
+        return registro
+
+    def _guardar(self, registro, inicio, segundos):
+        registro["segundos"] = round(segundos, 6)
+        registro["inicio"] = round(inicio - self._t0, 6)
+        registro["thread"] = threading.current_thread().name
+        with self._lock:
+            self._registros.append(registro)
+
+    def decorrido(self):
+        """Segundos desde o início da execução."""
+        return time.perf_counter() - self._t0
+
+    def registros(self):
+        with self._lock:
+            return list(self._registros)
+
+    def tabela(self):
+        """Resumo por etapa dos registros desta medição (ver tabela_registros)."""
+        return tabela_registros(self.registros())
+
+    def jsonl(self):
+        """Registros em JSON lines (um objeto por linha)."""
+        return "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in self.registros())
+
+    def exportar(self, caminho):
+        """Acrescenta a `caminho` os registros ainda não exportados por esta Medicao."""
+        with self._lock:
+            novos = self._registros[self._exportados:]
+            self._exportados = len(self._registros)
+        if not novos:
+            return
+        with open(caminho, "a", encoding="utf-8") as f:
+            for registro in novos:
+                f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+
+
+def tabela_registros(registros):
+    """
+    Resumo por etapa, da mais demorada para a menos: vezes, tempo total e
+    máximo, linhas e bytes somados e o item (arquivo, indicador...) mais lento.
+    """
+    colunas = ["etapa", "vezes", "total_s", "max_s", "linhas", "bytes", "mais_lento"]
+    df = pd.DataFrame(registros)
+    if df.empty:
+        return pd.DataFrame(columns=colunas)
+    for col in ("linhas", "bytes"):
+        df[col] = pd.to_numeric(df[col], errors="coerce") if col in df.columns else np.nan
+    item = pd.Series(pd.NA, index=df.index, dtype=object)
+    for atributo in reversed(ATRIBUTOS_ITEM):
+        if atributo in df.columns:
+            item = df[atributo].where(df[atributo].notna(), item)
+    df["item"] = item
+
+    grupos = df.groupby("etapa", sort=False)
+    tabela = pd.DataFrame({
+        "vezes": grupos.size(),
+        "total_s": grupos["segundos"].sum(),
+        "max_s": grupos["segundos"].max(),
+        "linhas": grupos["linhas"].sum(min_count=1),
+        "bytes": grupos["bytes"].sum(min_count=1),
+        "mais_lento": df.loc[grupos["segundos"].idxmax(), ["etapa", "item"]].set_index("etapa")["item"],
+    })
+    return tabela.sort_values("total_s", ascending=False).reset_index()[colunas]
+
+
+MEDICAO_INATIVA = Medicao(ativa=False)
@@ -0,0 +1,451 @@
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from cache_disco import CacheArquivos, TotaisDiarios, limites_mes
+from calculos import (
+    agregar_diario, calcular_cubo, calcular_metas_dinamicas, colunas_status, filtrar_cubo, meta_geral,
+    particionar_por_penalidade, pivot_indicador, resumo_status_nucleos,
+)
+from esquema import aplicar_esquema
+from indicadores import (
+    INDICADOR_TEMA_MAP, LOWER_IS_BETTER_LIST, METAS_DINAMICAS, METAS_FIXAS, METAS_MEDIA, PENALIDADES_MEDIA,
+    PENALIDADES_OCULTAS, PERCENTUAIS_LIST, ordem_indicadores,
+)
+from ingestao import (
+    MAX_WORKERS_PADRAO, ConsolidadoIncremental, Projecao, baixar_arquivos_por_id, concatenar_sem_sobreposicao,
+    meses_do_periodo, selecionar_arquivos_periodo,
+)
+from medicao import MEDICAO_INATIVA
+
+# ===============================
+# MOTOR DE CONSOLIDAÇÃO
+# ===============================
+# O cálculo da página sem Streamlit: carga do período (partições de meses
+# fechados + fonte), consolidação, cubo, metas e a tabela de cada indicador
+# (pivot, Meta, Acum, linha GERAL e status). A página acrescenta os caches
+# entre sessões e a exibição; exportar_tabelas.py usa o motor direto.
+
+COLUNAS_LINHA = ["Regional", "Nucleo", "Setor"]
+
+# Dias depois do fim do mês até ele contar como fechado (e virar partição): o
+# export de um dia costuma chegar no dia seguinte, então no dia 1º o último
+# dia do mês anterior ainda pode faltar. Até lá o mês segue incremental.
+CARENCIA_MES_FECHADO_DIAS = int(os.environ.get("DAILY_CARENCIA_MES_FECHADO_DIAS", 2))
+
+# O que a página e a exportação usam de cada tabela dos JSONs: as colunas dos
+# totais diários e as penalidades que viram tabela ou meta dinâmica (as
+# "Penal*" e as ocultas que não são meta saem já no parse de cada arquivo)
+COLUNAS_INGESTAO = ["Penalidades", "Chave2", "Data", "Contagem"]
+PROJECAO_DASHBOARD = Projecao(
+    colunas=COLUNAS_INGESTAO,
+    descartar=PENALIDADES_OCULTAS - set(METAS_DINAMICAS.values()),
+    descartar_prefixos=("Penal",),
+)
+
+
+# ===============================
+# CARGA E CONSOLIDAÇÃO
+# ===============================
+
+def totais_por_arquivo(frames, falhas, contadores, medicao=MEDICAO_INATIVA):
+    """
+    Resultado de baixar_arquivos_por_id com cada arquivo já reduzido a totais
+    diários; soma em `contadores["datas_lentas"]` as linhas cuja Data precisou
+    do parse lento.
+    """
+    contadores["datas_lentas"] += sum(df.attrs.get("datas_lentas", 0) for df in frames.values())
+    totais = {}
+    for file_id, df in frames.items():
+        with medicao.etapa("totais_diarios", arquivo=file_id) as registro:
+            totais[file_id] = agregar_diario(df)
+            registro["linhas"] = len(df)
+    return totais, falhas
+
+
+def consolidar_totais(df_raw, nucleos):
+    """Totais diários brutos -> consolidado: código de núcleo, Tema e os tipos do esquema."""
+    if df_raw.empty:
+        return pd.DataFrame()
+
+    # Núcleos: cada linha guarda só o código da dimensão (sem merge nem colunas
+    # repetidas); Regional/Núcleo/Setor são resolvidos na exibição
+    df_final = nucleos.codificar_fatos(df_raw)
+
+    # Mapeamento de Tema
+    if "Penalidades" in df_final.columns:
+        df_final["Tema"] = df_final["Penalidades"].map(INDICADOR_TEMA_MAP).fillna("Outros")
+    else:
+        df_final["Tema"] = "Outros"
+
+    # Tipos definitivos, aplicados uma única vez: dimensões categóricas, totais
+    # numéricos e Data datetime64
+    return aplicar_esquema(df_final)
+
+
+def recortar_meses(partes, data_inicio, data_fim):
+    """
+    Junta os meses do período (em ordem) e mantém só os dias entre
+    `data_inicio` e `data_fim`. Um dia que aparece em mais de um mês (um
+    export do dia 1º que traz também o dia 31 anterior) fica só do mês mais
+    recente, como entre arquivos de um mesmo mês (ver
+    ingestao.concatenar_sem_sobreposicao). Retorna (df, linhas_descartadas).
+    """
+    partes = [df for df in partes if not df.empty]
+    if not partes:
+        return pd.DataFrame(), 0
+    df, descartadas = concatenar_sem_sobreposicao(partes)
+    if len(partes) > 1:
+        # Categorias diferentes entre meses viram object no concat; o esquema volta a categorizar
+        df = aplicar_esquema(df)
+    dentro = (df["Data"] >= pd.Timestamp(data_inicio)) & (df["Data"] <= pd.Timestamp(data_fim))
+    return df[dentro].reset_index(drop=True), descartadas
+
+
+class CargaPeriodo:
+    """
+    Carga de um período mês a mês, a mesma na página e na exportação: meses
+    fechados vêm da partição em disco; os demais são sincronizados com a
+    fonte de forma incremental (ConsolidadoIncremental, com o cache de
+    arquivos e a `projecao` aplicada a cada tabela) e os fechados viram
+    partição quando a carga vem completa. Um mês só conta como fechado
+    `carencia_dias` dias depois do seu último dia.
+
+    `listar_mes`, `estado_mes`, `ler_particao`, `consolidar_mes`,
+    `particao_gravada` e `recortar` são os pontos de extensão: aqui sem
+    cache nenhum; a página os sobrescreve com os caches do Streamlit e o
+    estado incremental compartilhado entre sessões.
+    """
+
+    def __init__(self, fonte, nucleos, hoje=None, max_workers=MAX_WORKERS_PADRAO, medicao=MEDICAO_INATIVA,
+                 projecao=PROJECAO_DASHBOARD, carencia_dias=CARENCIA_MES_FECHADO_DIAS):
+        self.fonte = fonte
+        self.nucleos = nucleos
+        self.hoje = hoje or date.today()
+        self.carencia = timedelta(days=carencia_dias)
+        self.max_workers = max_workers
+        self.medicao = medicao
+        self.projecao = projecao
+        self.cache = CacheArquivos()
+        self.particoes = TotaisDiarios()
+
+    def listar_mes(self, ano, mes, forcar):
+        """Listagem de um mês da fonte (`forcar` pede uma listagem nova, sem cache)."""
+        return self.fonte.listar_mes(ano, mes)
+
+    def estado_mes(self, ano, mes):
+        """ConsolidadoIncremental do mês (aqui um novo a cada carga)."""
+        return ConsolidadoIncremental()
+
+    def ler_particao(self, ano, mes):
+        """Totais do mês fechado guardados em disco, já codificados, ou None."""
+        df = self.particoes.ler(self.fonte.identificador, ano, mes, self.projecao.chave)
+        # Códigos de núcleo sempre da dimensão atual (a partição pode ser de outra versão)
+        return None if df is None else self.nucleos.codificar_fatos(df)
+
+    def consolidar_mes(self, ano, mes, versao, df_raw):
+        """Consolidado do mês a partir dos totais brutos; `versao` identifica o conteúdo de `df_raw`."""
+        return consolidar_totais(df_raw, self.nucleos)
+
+    def particao_gravada(self, ano, mes):
+        """Chamado depois de gravar a partição de um mês (para invalidar caches)."""
+
+    def recortar(self, chave_dados, partes, data_inicio, data_fim):
+        """(df, linhas_descartadas) do período; ver recortar_meses."""
+        return recortar_meses(partes, data_inicio, data_fim)
+
+    def sincronizar_mes(self, estado, ano, mes, fim_carga, forcar, contadores):
+        """Atualiza `estado` com a listagem do mês até `fim_carga`; devolve as falhas."""
+        with self.medicao.etapa("listagem", mes=f"{ano}-{mes:02d}") as registro:
+            listados = self.listar_mes(ano, mes, forcar)
+            registro["linhas"] = len(listados)
+        arquivos = selecionar_arquivos_periodo(listados, date(ano, mes, 1), fim_carga)
+        resumo = estado.atualizar(
+            arquivos,
+            lambda pendentes: totais_por_arquivo(
+                *baixar_arquivos_por_id(
+                    self.fonte, pendentes, max_workers=self.max_workers, cache=self.cache,
+                    medicao=self.medicao, projecao=self.projecao,
+                ),
+                contadores, self.medicao,
+            ),
+        )
+        return resumo["falhas"]
+
+    def carregar(self, data_inicio, data_fim, forcar=False):
+        """
+        Consolidado do período. Com `forcar`, meses fechados também são
+        relidos da fonte (e a partição regravada). Retorna (df, falhas,
+        contadores, chave_dados): falhas de arquivo trazem o "id"; problemas
+        da fonte como um todo (configuração, listagem) vêm com "id" None.
+        `contadores` soma as linhas cuja Data precisou do parse lento e os
+        totais diários repetidos entre arquivos (ou meses) descartados; `chave_dados`
+        identifica o conteúdo para os caches derivados.
+        """
+        problema = self.fonte.problema_configuracao()
+        partes, versoes, falhas = [], [], []
+        if problema:
+            falhas.append({"arquivo": self.fonte.nome, "id": None, "erro": problema})
+        contadores = {"datas_lentas": 0, "linhas_sobrepostas": 0}
+        for ano, mes in meses_do_periodo(data_inicio, data_fim):
+            inicio_mes, fim_mes = limites_mes(ano, mes)
+            fechado = fim_mes + self.carencia < self.hoje
+            df_mes = None
+            if fechado and not forcar:
+                with self.medicao.etapa("particao_leitura", mes=f"{ano}-{mes:02d}") as registro:
+                    df_mes = self.ler_particao(ano, mes)
+                    registro["linhas"] = 0 if df_mes is None else len(df_mes)
+                versao = f"particao-{ano}-{mes:02d}"
+            if df_mes is None:
+                # Sempre o mês inteiro (até hoje, no corrente): o estado incremental é
+                # o mesmo para o seletor de mês, intervalos e janelas móveis
+                estado = self.estado_mes(ano, mes)
+                falhas_mes = []
+                if not problema:
+                    try:
+                        falhas_mes = self.sincronizar_mes(estado, ano, mes, min(fim_mes, self.hoje), forcar, contadores)
+                    except Exception as e:
+                        falhas_mes = [{"arquivo": self.fonte.nome, "id": None, "erro": str(e)}]
+                versao = estado.versao
+                df_raw = estado.frame()
+                contadores["linhas_sobrepostas"] += estado.linhas_sobrepostas
+                with self.medicao.etapa("consolidacao", mes=f"{ano}-{mes:02d}") as registro:
+                    df_mes = self.consolidar_mes(ano, mes, versao, df_raw)
+                    registro["linhas"] = len(df_mes)
+                falhas.extend(falhas_mes)
+                if fechado and not problema and not falhas_mes and not df_mes.empty:
+                    self.particoes.gravar(self.fonte.identificador, ano, mes, df_mes, self.projecao.chave)
+                    self.particao_gravada(ano, mes)
+            partes.append(df_mes)
+            versoes.append(versao)
+
+        chave_dados = (
+            f"{data_inicio}:{data_fim}:{'|'.join(versoes)}:{self.nucleos.versao}:{self.projecao.chave}"
+        )
+        with self.medicao.etapa("recorte_periodo") as registro:
+            df, descartadas = self.recortar(chave_dados, partes, data_inicio, data_fim)
+            registro["linhas"] = len(df)
+        contadores["linhas_sobrepostas"] += descartadas
+        return df, falhas, contadores, chave_dados
+
+
+def carregar_periodo(fonte, nucleos, data_inicio, data_fim, hoje=None, max_workers=MAX_WORKERS_PADRAO,
+                     medicao=MEDICAO_INATIVA, projecao=PROJECAO_DASHBOARD, forcar=False):
+    """Consolidado de um período sem cache entre chamadas (ver CargaPeriodo); retorna (df, falhas, contadores)."""
+    carga = CargaPeriodo(fonte, nucleos, hoje=hoje, max_workers=max_workers, medicao=medicao, projecao=projecao)
+    df, falhas, contadores, _ = carga.carregar(data_inicio, data_fim, forcar=forcar)
+    return df, falhas, contadores
+
+
+# ===============================
+# CUBO, METAS E RECORTE
+# ===============================
+
+def separar_exibicao(df_merged, nucleos):
+    """
+    (df_exib, dims_exib): totais das penalidades que viram tabela e a
+    Regional/Núcleo/Setor dos códigos presentes (para filtros e metas).
+    """
+    df_exib = df_merged[~df_merged["Penalidades"].str.startswith("Penal", na=False)]
+    df_exib = df_exib[~df_exib["Penalidades"].isin(PENALIDADES_OCULTAS)]
+    dims_exib = nucleos.resolver(np.unique(df_exib["CodNucleo"]))
+    dims_exib["Setor"] = dims_exib["Setor"].fillna("-")
+    return df_exib, dims_exib
+
+
+def calcular_metas(df_merged, nucleos, dims_exib):
+    """(metas_setor, parciais_nucleo) de todas as metas dinâmicas (ver calculos.calcular_metas_dinamicas)."""
+    return calcular_metas_dinamicas(
+        df_merged, METAS_DINAMICAS, METAS_MEDIA, nucleos,
+        dims_exib["Nucleo"].unique().tolist(), dims_exib["Setor"].unique().tolist(),
+    )
+
+
+def penalidades_do_tema(cubo, temas):
+    """Penalidades do cubo cujo Tema está em `temas`."""
+    return [
+        p for p in cubo.index.get_level_values("Penalidades").unique()
+        if INDICADOR_TEMA_MAP.get(p, "Outros") in temas
+    ]
+
+
+def indicadores_presentes(cubo_filt):
+    """Indicadores com dado no cubo filtrado, na ordem fixa de exibição."""
+    presentes = set(cubo_filt.index.get_level_values("Penalidades").unique())
+    return [p for p in ordem_indicadores() if p in presentes]
+
+
+def resumo_nucleos(cubo_filt, metas_setor):
+    """Acum, Meta e status de cada (indicador, Regional, Núcleo) (ver calculos.resumo_status_nucleos)."""
+    return resumo_status_nucleos(
+        cubo_filt, PENALIDADES_MEDIA, PERCENTUAIS_LIST, LOWER_IS_BETTER_LIST, METAS_FIXAS, metas_setor
+    )
+
+
+# ===============================
+# TABELA DE CADA INDICADOR
+# ===============================
+
+def rotulos_datas(datas):
+    """
+    Rótulos das colunas de data da tabela: "dd/mm", ou "dd/mm/aa" quando o
+    período tem o mesmo dia e mês em anos diferentes (intervalos de mais de
+    um ano), para nenhuma coluna se confundir com outra.
+    """
+    datas = pd.DatetimeIndex(datas)
+    rotulos = datas.strftime("%d/%m")
+    if not rotulos.is_unique:
+        rotulos = datas.strftime("%d/%m/%y")
+    return list(rotulos)
+
+
+def calcular_acum_ultimo_dia(df, penalidade):
+    cols_datas = [c for c in df.columns if c not in ["Regional", "Nucleo", "Setor", "Meta", "Acum"]]
+    if cols_datas:
+        ultimo_col = cols_datas[-1]
+        df["Acum"] = df[ultimo_col]
+    else:
+        df["Acum"] = pd.NA
+    cols = df.columns.tolist()
+    if "Acum" in cols:
+        cols.remove("Acum")
+        insert_pos = 3 if len(cols) >= 3 else len(cols)
+        cols.insert(insert_pos, "Acum")
+        df = df[cols]
+    return df
+
+
+def montar_tabela_indicador(pen, fatia, metas_setor, parciais_metas, nucleos, medicao=MEDICAO_INATIVA):
+    """
+    (tabela, geral) de um indicador a partir da sua fatia do cubo: linhas de
+    setor com as datas em "dd/mm" (ver rotulos_datas), Acum, Meta, status
+    _st_<coluna> e o id inteiro _id; geral é a linha GERAL. None se o
+    indicador não tiver dado.
+    """
+    # ============================================================
+    # LÓGICA DE TRATAMENTO DE NULOS
+    # ============================================================
+    # Regra:
+    # 1. Se for Média de Porcentagem (ex: VPML%):
+    #    NÃO preencher com 0. O NaN é ignorado no cálculo da média.
+    # 2. Se for Média de Inteiros/Decimais (ex: EventosExcessos) OU Soma:
+    #    NaN conta como 0, pois ausência de dado significa "0 ocorrências".
+    # As três variantes já estão no cubo (Media, Soma / Linhas e Soma).
+    eh_media = pen in PENALIDADES_MEDIA
+    eh_percentual = pen in PERCENTUAIS_LIST
+
+    with medicao.etapa("pivot", indicador=pen) as registro:
+        pivot = pivot_indicador(fatia, eh_media, eh_percentual)
+        registro["linhas"] = len(pivot)
+    if pivot.empty:
+        return None
+    if "Data" in pivot.columns: pivot = pivot.drop(columns=["Data"])
+    pivot.columns = rotulos_datas(pivot.columns)
+    df_data_raw = pivot.reset_index()
+    if "Data" in df_data_raw.columns: df_data_raw = df_data_raw.drop(columns=["Data"])
+    colunas_duplicadas = [c for c in df_data_raw.columns if c.lower().strip() == "data"]
+    if colunas_duplicadas: df_data_raw = df_data_raw.drop(columns=colunas_duplicadas)
+    if df_data_raw.columns.duplicated().any():
+        repetidas = sorted(set(df_data_raw.columns[df_data_raw.columns.duplicated()]))
+        raise ValueError(f"colunas repetidas na tabela de {pen}: {repetidas}")
+    df_data_raw = df_data_raw[
+        [c for c in df_data_raw.columns if not ("00:00" in str(c) or "Data" in str(c))]]
+
+    cols_data_in_pivot = [c for c in df_data_raw.columns if c not in COLUNAS_LINHA]
+
+    if eh_media:
+        cols_to_fill_mean = [c for c in cols_data_in_pivot if c not in ["Meta", "Acum"]]
+        for c in cols_to_fill_mean: df_data_raw[c] = df_data_raw[c].mask(pd.isna(df_data_raw[c]), None)
+    else:
+        for c in cols_data_in_pivot: df_data_raw[c] = df_data_raw[c].fillna(0.0)
+
+    df_data_raw = calcular_acum_ultimo_dia(df_data_raw, pen)
+
+    # Meta do setor por alinhamento de índice (Penalidades, Nucleo, Setor)
+    if pen in metas_setor.index.unique("Penalidades"):
+        setores_pivot = pd.MultiIndex.from_frame(df_data_raw[["Nucleo", "Setor"]])
+        df_data_raw["Meta"] = metas_setor.xs(pen).reindex(setores_pivot).to_numpy()
+    else:
+        df_data_raw["Meta"] = METAS_FIXAS.get(pen, pd.NA)
+
+    df_data_raw["Meta"] = pd.to_numeric(df_data_raw["Meta"], errors='coerce')
+
+    cols_data_to_check = [c for c in df_data_raw.columns if c not in COLUNAS_LINHA]
+    df_data_raw['has_data'] = df_data_raw[cols_data_to_check].notna().any(axis=1)
+    df_data_raw = df_data_raw[df_data_raw['has_data']].drop(columns=['has_data'])
+
+    if df_data_raw.empty:
+        return None
+
+    # Cálculo GERAL
+    cols_data_in_pivot_geral = [c for c in df_data_raw.columns if c not in COLUNAS_LINHA + ["Meta", "Acum"]]
+    if eh_media:
+        geral_vals = df_data_raw[cols_data_in_pivot_geral].apply(
+            lambda col: col[col.notna()].mean() if len(col[col.notna()]) > 0 else pd.NA, axis=0)
+    else:
+        geral_vals = df_data_raw[cols_data_in_pivot_geral].apply(lambda col: col.sum(), axis=0)
+
+    geral = pd.DataFrame([geral_vals]).astype(float)
+    geral["Regional"] = "GERAL"
+    geral["Nucleo"] = "-"
+    geral["Setor"] = "-"
+    geral = geral[COLUNAS_LINHA + geral_vals.index.tolist()]
+
+    if pen in METAS_DINAMICAS:
+        valor_meta_geral = meta_geral(
+            parciais_metas, pen, df_data_raw["Nucleo"].unique().tolist(), pen in METAS_MEDIA
+        )
+    else:
+        valor_meta_geral = METAS_FIXAS.get(pen, pd.NA)
+
+    geral["Meta"] = valor_meta_geral
+    cols_datas_geral = [c for c in geral.columns if c not in COLUNAS_LINHA + ["Meta"]]
+    geral["Acum"] = geral[cols_datas_geral[-1]] if cols_datas_geral else pd.NA
+
+    cols = geral.columns.tolist()
+    for col in ["Meta", "Acum"]:
+        if col in cols: cols.remove(col)
+    cols.insert(3, "Acum")
+    cols.insert(4, "Meta")
+    geral = geral[cols]
+
+    # Status de cada célula (Acum e datas) contra a Meta da linha, em lote;
+    # o grid só lê as colunas _st_ e não recalcula a cor no navegador
+    menor_melhor = pen in LOWER_IS_BETTER_LIST
+    cols_com_status = [c for c in df_data_raw.columns if c not in COLUNAS_LINHA + ["Meta"]]
+    df_data_raw = df_data_raw.join(colunas_status(df_data_raw, cols_com_status, menor_melhor))
+    geral = geral.join(colunas_status(geral, cols_com_status, menor_melhor))
+    # Id inteiro de cada linha para o getRowId do grid (sem concatenar textos)
+    df_data_raw["_id"] = nucleos.codigo_setor(df_data_raw)
+    return df_data_raw, geral
+
+
+def calcular_tabelas(df_merged, nucleos, indicadores=None, medicao=MEDICAO_INATIVA):
+    """
+    Tudo o que a página mostra de um consolidado, sem filtros: ({indicador:
+    (tabela, geral)}, resumo por núcleo). Com `indicadores`, só esses.
+    """
+    df_exib, dims_exib = separar_exibicao(df_merged, nucleos)
+    with medicao.etapa("cubo") as registro:
+        cubo = calcular_cubo(df_exib, nucleos)
+        registro["linhas"] = len(cubo)
+    with medicao.etapa("metas") as registro:
+        metas_setor, parciais_metas = calcular_metas(df_merged, nucleos, dims_exib)
+        registro["linhas"] = len(metas_setor)
+    if indicadores:
+        cubo = filtrar_cubo(cubo, [("Penalidades", indicadores)])
+    with medicao.etapa("resumo") as registro:
+        resumo = resumo_nucleos(cubo, metas_setor)
+        registro["linhas"] = len(resumo)
+
+    fatias = particionar_por_penalidade(cubo)
+    tabelas = {}
+    for pen in indicadores_presentes(cubo):
+        with medicao.etapa("indicador", indicador=pen) as registro:
+            resultado = montar_tabela_indicador(pen, fatias.get(pen), metas_setor, parciais_metas, nucleos, medicao)
+            registro["linhas"] = 0 if resultado is None else len(resultado[0])
+        if resultado is not None:
+            tabelas[pen] = resultado
+    return tabelas, resumo
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from cache_disco import diretorio_cache, gravar_parquet_atomico, preparar_para_parquet
+
+# ===============================
+# DIMENSÃO DE NÚCLEOS
+# ===============================
+# A planilha de núcleos vira uma tabela pequena indexada por Chave
+# (Empresa + Setor). Os fatos guardam só o código inteiro da linha
+# (CodNucleo); Regional, Núcleo e Setor são resolvidos na hora de exibir.
+
+URL_NUCLEOS = (
+    "https://docs.google.com/spreadsheets/d/1N2C-g4RSV4nOaPOwqp_u85395p6xv0OiBs-akfxLTfk/export?format=csv&gid=0"
+)
+ARQUIVO_NUCLEOS_LOCAL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dBase Nucleos.xlsx")
+ABA_NUCLEOS_LOCAL = "Nucleos"
+COLUNAS_NUCLEOS = ["Empresa", "Setor", "Nucleo", "Regional"]
+COLUNAS_DIMENSAO = ["Regional", "Nucleo", "Setor"]
+# Cópia da última planilha baixada é reaproveitada por esse tempo (inclusive após reiniciar)
+VALIDADE_COPIA_SEGUNDOS = 3600
+
+CODIGO_DESCONHECIDO = -1
+
+
+class TabelaNucleos:
+    """
+    Núcleos indexados por Chave. `versao` muda quando o conteúdo muda, para
+    invalidar os caches que guardam códigos; `origem` diz de onde veio
+    ("planilha", "copia" ou "local").
+    """
+
+    def __init__(self, df, origem):
+        df = df.copy()
+        df.columns = df.columns.str.strip()
+        faltantes = [col for col in COLUNAS_NUCLEOS if col not in df.columns]
+        if faltantes:
+            raise ValueError(f"Colunas faltantes na planilha de Núcleos: {faltantes}")
+        df["Chave"] = df["Empresa"].astype(str) + df["Setor"].astype(str)
+        df = df.drop_duplicates("Chave").reset_index(drop=True)
+
+        self.origem = origem
+        self.dimensao = df[["Chave", "Empresa"] + COLUNAS_DIMENSAO]
+        self._indice = pd.Index(self.dimensao["Chave"])
+        # (Regional, Nucleo, Setor) distintos, como aparecem no cubo (Setor vazio vira "-")
+        self._setores = pd.MultiIndex.from_frame(
+            self.dimensao[COLUNAS_DIMENSAO].fillna({"Setor": "-"}).drop_duplicates()
+        )
+        conteudo = pd.util.hash_pandas_object(self.dimensao.astype(str), index=False).to_numpy()
+        self.versao = hashlib.sha1(conteudo.tobytes()).hexdigest()[:12]
+
+    def __len__(self):
+        return len(self.dimensao)
+
+    def codificar(self, chaves):
+        """CodNucleo (int16) de cada Chave2; CODIGO_DESCONHECIDO se não estiver na planilha."""
+        chaves = pd.Series(chaves)
+        if isinstance(chaves.dtype, pd.CategoricalDtype):
+            # Uma busca por categoria, depois só um take pelos códigos da categoria
+            por_categoria = self._indice.get_indexer(chaves.cat.categories.astype(str))
+            codigos = np.append(por_categoria, CODIGO_DESCONHECIDO)[chaves.cat.codes.to_numpy()]
+        else:
+            codigos = self._indice.get_indexer(chaves.astype(str))
+        return codigos.astype(np.int16)
+
+    def codificar_fatos(self, df):
+        """Fatos com CodNucleo (a partir de Chave2) no lugar das colunas da dimensão."""
+        df = df.drop(columns=[c for c in COLUNAS_DIMENSAO if c in df.columns])
+        if "Chave2" in df.columns:
+            df["CodNucleo"] = self.codificar(df["Chave2"])
+        else:
+            df["CodNucleo"] = np.int16(CODIGO_DESCONHECIDO)
+        return df
+
+    def resolver(self, codigos):
+        """DataFrame Regional/Nucleo/Setor alinhado a `codigos` (código desconhecido vira vazio)."""
+        codigos = np.asarray(codigos)
+        validos = codigos != CODIGO_DESCONHECIDO
+        if not len(self):
+            return pd.DataFrame(np.nan, index=range(len(codigos)), columns=COLUNAS_DIMENSAO, dtype=object)
+        linhas = self.dimensao[COLUNAS_DIMENSAO].iloc[np.where(validos, codigos, 0)].reset_index(drop=True)
+        linhas.loc[~validos, :] = np.nan
+        return linhas
+
+    def codigo_setor(self, df):
+        """
+        Código inteiro de cada linha (Regional, Nucleo, Setor) de `df`, estável
+        enquanto a dimensão não muda (-1 se a combinação não existir).
+        """
+        return self._setores.get_indexer(pd.MultiIndex.from_frame(df[COLUNAS_DIMENSAO]))
+
+    def anexar(self, df):
+        """Cópia de `df` com as colunas Regional/Nucleo/Setor resolvidas a partir de CodNucleo."""
+        dims = self.resolver(df["CodNucleo"].to_numpy())
+        dims.index = df.index
+        return pd.concat([df, dims], axis=1)
+
+
+def _caminho_copia():
+    return os.path.join(diretorio_cache(), "nucleos.parquet")
+
+
+def carregar_tabela_nucleos(url=URL_NUCLEOS, arquivo_local=ARQUIVO_NUCLEOS_LOCAL):
+    """
+    Dimensão de núcleos. Ordem: cópia em disco recente (sem rede), planilha
+    do Google (atualiza a cópia), cópia antiga e, por fim, a planilha local
+    que acompanha o repositório.
+    """
+    copia = _caminho_copia()
+    copia_existe = os.path.exists(copia)
+    if copia_existe and time.time() - os.path.getmtime(copia) < VALIDADE_COPIA_SEGUNDOS:
+        try:
+            return TabelaNucleos(pd.read_parquet(copia), "copia")
+        except Exception:
+            pass
+
+    try:
+        tabela = TabelaNucleos(pd.read_csv(url), "planilha")
+        try:
+            gravar_parquet_atomico(preparar_para_parquet(tabela.dimensao[COLUNAS_NUCLEOS]), copia)
+        except OSError:
+            pass
+        return tabela
+    except Exception:
+        if copia_existe:
+            try:
+                return TabelaNucleos(pd.read_parquet(copia), "copia")
+            except Exception:
+                pass
+    return TabelaNucleos(pd.read_excel(arquivo_local, sheet_name=ABA_NUCLEOS_LOCAL), "local")